@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the public API of cn_stock_holidays.
+
+It runs offline and writes the results as JSON, so that results of two
+releases can be compared. Zipline calendars are skipped when zipline is not
+installed.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --output before.json --filter trading_days
+    # or
+    uv run python benchmarks/run_benchmarks.py
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import timeit
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import cn_stock_holidays.data as shsz
+import cn_stock_holidays.data_hk as hkex
+
+BENCHMARKS = []
+
+# Spring Festival and National Day, where next/previous skip the most days
+LONG_HOLIDAYS = [
+    datetime.date(2017, 1, 26),
+    datetime.date(2019, 10, 1),
+    datetime.date(2024, 2, 9),
+    datetime.date(2024, 10, 7),
+]
+
+
+def benchmark(function):
+    BENCHMARKS.append(function)
+    return function
+
+
+def measure(function, repeat=5, min_time=0.2):
+    """
+    time function with timeit, the number of calls per repeat is chosen so that
+    one repeat takes at least min_time seconds
+    :return: dict with per call timings in microseconds
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 10
+    times = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "calls": number,
+        "repeat": repeat,
+        "best_us": min(times),
+        "median_us": statistics.median(times),
+    }
+
+
+def measure_once(function, repeat=5):
+    """
+    time function for expensive calls, one call per repeat
+    :return: dict with timings in microseconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1e6)
+    return {
+        "calls": 1,
+        "repeat": repeat,
+        "best_us": min(times),
+        "median_us": statistics.median(times),
+    }
+
+
+def markets():
+    return (("shsz", shsz), ("hkex", hkex))
+
+
+def _set_is_trading_day(holidays):
+    """
+    is_trading_day of the releases before the trading day index, a weekday
+    check and a lookup in the function_cache'd holiday set, kept as the
+    reference the index based lookup must not be slower than
+    """
+    from cn_stock_holidays.common import function_cache
+
+    @function_cache
+    def get_cached(use_list=False):
+        return holidays
+
+    def is_trading_day(dt):
+        if dt is None:
+            raise TypeError("Date cannot be None")
+
+        if not isinstance(dt, (datetime.date, datetime.datetime)):
+            raise TypeError("Date must be datetime.date or datetime.datetime")
+
+        if type(dt) is datetime.datetime:
+            dt = dt.date()
+
+        if dt.weekday() >= 5:
+            return False
+        return dt not in get_cached()
+
+    return is_trading_day
+
+
+@benchmark
+def is_trading_day():
+    dt = datetime.date(2024, 2, 9)
+    for name, market in markets():
+        reference = _set_is_trading_day(market.get_cached())
+        result = measure(lambda: market.is_trading_day(dt))
+        baseline = measure(lambda: reference(dt))
+        result["set_baseline_best_us"] = baseline["best_us"]
+        result["ratio_to_set_baseline"] = result["best_us"] / baseline["best_us"]
+        if result["ratio_to_set_baseline"] > 1.2:
+            print(
+                f"WARNING: {name}.is_trading_day is "
+                f"{result['ratio_to_set_baseline']:.2f}x the set based lookup",
+                file=sys.stderr,
+            )
+        yield f"{name}.is_trading_day", result
+        yield f"{name}.is_trading_day[set baseline]", baseline
+
+
+@benchmark
+def next_previous_trading_day():
+    for name, market in markets():
+
+        def next_days():
+            for dt in LONG_HOLIDAYS:
+                market.next_trading_day(dt)
+
+        def previous_days():
+            for dt in LONG_HOLIDAYS:
+                market.previous_trading_day(dt)
+
+        yield f"{name}.next_trading_day[long holidays x{len(LONG_HOLIDAYS)}]", measure(
+            next_days
+        )
+        yield f"{name}.previous_trading_day[long holidays x{len(LONG_HOLIDAYS)}]", measure(
+            previous_days
+        )
+
+
+@benchmark
+def trading_days_between():
+    end = datetime.date(2024, 12, 31)
+    windows = (
+        ("1y", datetime.date(2024, 1, 1)),
+        ("10y", datetime.date(2015, 1, 1)),
+        ("full", datetime.date(1990, 12, 19)),
+    )
+    for name, market in markets():
+        for label, start in windows:
+            yield f"{name}.trading_days_between[{label}]", measure(
+                lambda: list(market.trading_days_between(start, end))
+            )
+            yield f"{name}.trading_days_between_array[{label}]", measure(
+                lambda: market.trading_days_between_array(start, end)
+            )
+
+
+@benchmark
+def check_expired():
+    for name, market in markets():
+        yield f"{name}.check_expired", measure(market.check_expired)
+        yield f"{name}.days_until_expiry", measure(market.days_until_expiry)
+
+
+@benchmark
+def get_cached():
+    for name, market in markets():
+
+        def cold():
+            market.get_cached.cache_clear()
+            market.get_cached()
+
+        yield f"{name}.get_cached[warm]", measure(market.get_cached)
+        yield f"{name}.get_cached[cold]", measure(cold)
+
+        try:
+            import pandas  # noqa: F401
+        except ImportError:
+            continue
+        yield f"{name}.get_holiday_index[warm]", measure(market.get_holiday_index)
+
+
+def _run_threads(n_threads, function):
+    """
+    run function in n_threads threads which start together
+    :return: wall time in seconds
+    """
+    barrier = threading.Barrier(n_threads + 1)
+
+    def run():
+        barrier.wait()
+        function()
+
+    threads = [threading.Thread(target=run) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+@benchmark
+def threaded_lookups():
+    # lookups only scale with threads on free-threaded builds, with the GIL the
+    # total throughput should at least not drop when the data is refreshed
+    days = [datetime.date(2024, 1, 1) + datetime.timedelta(i) for i in range(366)]
+    rounds = 200
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+
+    for name, market in markets():
+
+        def lookups():
+            for _ in range(rounds):
+                for dt in days:
+                    market.is_trading_day(dt)
+
+        def refresh_until(stop):
+            while not stop.is_set():
+                market.get_snapshot.refresh()
+                time.sleep(0.01)
+
+        for n_threads in (1, 2, 4, 8):
+            for refreshing in (False, True):
+                stop = threading.Event()
+                refresher = threading.Thread(target=refresh_until, args=(stop,))
+                if refreshing:
+                    refresher.start()
+                elapsed = min(_run_threads(n_threads, lookups) for _ in range(3))
+                stop.set()
+                if refreshing:
+                    refresher.join()
+
+                n_lookups = n_threads * rounds * len(days)
+                label = ", refreshing" if refreshing else ""
+                yield f"{name}.is_trading_day[{n_threads} threads{label}]", {
+                    "threads": n_threads,
+                    "gil_enabled": gil_enabled,
+                    "best_us": elapsed / n_lookups * 1e6,
+                    "lookups_per_s": n_lookups / elapsed,
+                }
+
+
+@benchmark
+def parse_data_files():
+    from cn_stock_holidays.calendar_file import _parse
+    from cn_stock_holidays.common import _parse_data, _read_file
+
+    for filename in sorted((project_root / "cn_stock_holidays").glob("*.txt")):
+        data = _read_file(str(filename))
+        result = measure(lambda: _parse_data(data))
+        result["lines_per_s"] = data.count(b"\n") / result["best_us"] * 1e6
+        result["mb_per_s"] = len(data) / result["best_us"]
+        yield f"parse[{filename.name}]", result
+        yield f"parse_and_index[{filename.name}]", measure(lambda: _parse(data))
+
+
+def _run_python(args, **kwargs):
+    """
+    run the python interpreter of the benchmarks in the project root, so the
+    child imports the same cn_stock_holidays wherever the script is run from
+    """
+    return subprocess.run(
+        [sys.executable] + args, cwd=str(project_root), check=True, **kwargs
+    )
+
+
+@benchmark
+def first_lookup_in_new_process():
+    code = (
+        "import datetime, cn_stock_holidays.data as shsz; "
+        "shsz.is_trading_day(datetime.date(2024, 2, 9))"
+    )
+    yield "shsz.import_and_first_lookup[process]", measure_once(
+        lambda: _run_python(["-c", code])
+    )
+
+
+@benchmark
+def get_day_list_cli():
+    args = ["-m", "cn_stock_holidays.tools.cmd", "-s", "20150101", "-e", "20241231"]
+    for market in ("cn", "hk"):
+        yield f"get-day-list[{market}, 10y, process]", measure_once(
+            lambda: _run_python(args + ["-m", market], stdout=subprocess.DEVNULL)
+        )
+
+
+# session times in UTC: open, lunch break start, lunch break end, close
+SESSION_TIMES_UTC = {
+    "shsz": ("01:31", "03:30", "05:01", "07:00"),
+    "hkex": ("02:01", "04:30", "06:31", "08:00"),
+}
+
+
+def _all_minutes_loop(opens, lunch_break_starts, lunch_break_ends, closes):
+    """
+    the all_minutes loop of the zipline calendars before it was vectorized,
+    kept as the reference result
+    """
+    import numpy as np
+
+    nanos_in_minute = 60 * 10**9
+    before_lunch_sizes = (lunch_break_starts - opens) / nanos_in_minute + 1
+    after_lunch_sizes = (closes - lunch_break_ends) / nanos_in_minute + 1
+    daily_sizes = before_lunch_sizes + after_lunch_sizes
+    all_minutes = np.empty(np.sum(daily_sizes).astype(np.int64), dtype="datetime64[ns]")
+
+    idx = 0
+    for day_idx, size in enumerate(daily_sizes):
+        size_int = int(size)
+        before_lunch_size_int = int(before_lunch_sizes[day_idx])
+        all_minutes[idx : (idx + before_lunch_size_int)] = np.arange(
+            opens[day_idx],
+            lunch_break_starts[day_idx] + nanos_in_minute,
+            nanos_in_minute,
+        )
+        all_minutes[(idx + before_lunch_size_int) : (idx + size_int)] = np.arange(
+            lunch_break_ends[day_idx],
+            closes[day_idx] + nanos_in_minute,
+            nanos_in_minute,
+        )
+        idx += size_int
+    return all_minutes
+
+
+@benchmark
+def all_minutes():
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    from cn_stock_holidays.session_minutes import MinuteWindows, two_segment_minutes
+
+    for name, market in markets():
+        days = market.trading_days_between_array(
+            datetime.date(1990, 12, 19), datetime.date.today()
+        ).astype("datetime64[ns]")
+        schedule = [
+            days + np.timedelta64(int(t[:2]) * 60 + int(t[3:]), "m")
+            for t in SESSION_TIMES_UTC[name]
+        ]
+
+        result = two_segment_minutes(*schedule)
+        if not np.array_equal(result, _all_minutes_loop(*schedule)):
+            raise AssertionError(f"{name}: all_minutes differs from the loop")
+
+        yield f"{name}.all_minutes[{len(days)} sessions, loop]", measure_once(
+            lambda: _all_minutes_loop(*schedule), repeat=3
+        )
+        yield f"{name}.all_minutes[{len(days)} sessions, vectorized]", measure(
+            lambda: two_segment_minutes(*schedule), repeat=3
+        )
+
+        # one month of minutes near the end, without all_minutes
+        windows = MinuteWindows(*schedule)
+        first, last = len(days) - 40, len(days) - 20
+
+        def month_uncached():
+            windows.cache_clear()
+            return windows.for_sessions(first, last)
+
+        yield f"{name}.minutes_for_sessions[20 sessions]", measure(month_uncached)
+        yield f"{name}.minutes_for_sessions[20 sessions, cached]", measure(
+            lambda: windows.for_sessions(first, last)
+        )
+        yield f"{name}.minutes_in_range[20 sessions]", measure(
+            lambda: windows.in_range(schedule[0][first], schedule[3][last])
+        )
+
+
+@benchmark
+def schedule_cache():
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    import tempfile
+
+    from cn_stock_holidays.schedule_cache import (
+        SCHEDULE_FIELDS,
+        load_schedule,
+        save_schedule,
+    )
+
+    for name, market in markets():
+        days = market.trading_days_between_array(
+            datetime.date(1990, 12, 19), datetime.date.today()
+        ).astype("datetime64[ns]")
+        schedule = dict(
+            zip(
+                SCHEDULE_FIELDS,
+                [days]
+                + [
+                    days + np.timedelta64(int(t[:2]) * 60 + int(t[3:]), "m")
+                    for t in SESSION_TIMES_UTC[name]
+                ],
+            )
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "schedule.npy")
+            yield f"{name}.save_schedule[{len(days)} sessions]", measure(
+                lambda: save_schedule(path, schedule)
+            )
+            yield f"{name}.load_schedule[{len(days)} sessions]", measure(
+                lambda: load_schedule(path)
+            )
+
+
+@benchmark
+def zipline_calendars():
+    try:
+        import tempfile
+
+        import pandas as pd
+
+        from cn_stock_holidays.zipline import HKExchangeCalendar, SHSZExchangeCalendar
+    except ImportError:
+        return
+
+    for name, calendar_class in (
+        ("shsz", SHSZExchangeCalendar),
+        ("hkex", HKExchangeCalendar),
+    ):
+        yield f"zipline.{name}.construct", measure_once(calendar_class, repeat=3)
+        yield f"zipline.{name}.construct[lazy minutes]", measure_once(
+            lambda: calendar_class(lazy_minutes=True), repeat=3
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calendar_class(lazy_minutes=True, schedule_cache_dir=tmpdir)
+            yield f"zipline.{name}.construct[schedule cache]", measure_once(
+                lambda: calendar_class(lazy_minutes=True, schedule_cache_dir=tmpdir),
+                repeat=3,
+            )
+        yield f"zipline.{name}.construct[1 year]", measure_once(
+            lambda: calendar_class(
+                start=pd.Timestamp("2023-01-01", tz="UTC"),
+                end=pd.Timestamp("2023-12-31", tz="UTC"),
+            ),
+            repeat=3,
+        )
+        yield f"zipline.{name}.all_minutes", measure_once(
+            lambda: calendar_class().all_minutes, repeat=3
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", "-o", default="-", help="Output file, - is stdout")
+    parser.add_argument(
+        "--filter", "-k", default="", help="Only run benchmarks containing this"
+    )
+    args = parser.parse_args(argv)
+
+    results = {}
+    for function in BENCHMARKS:
+        if args.filter not in function.__name__:
+            continue
+        try:
+            for name, result in function() or ():
+                results[name] = result
+                print(f"{name}: {result['best_us']:.2f} us", file=sys.stderr)
+        except Exception as e:
+            # keep the results of the other benchmarks
+            results[f"{function.__name__}[error]"] = {"error": repr(e)}
+            print(f"{function.__name__}: failed with {e!r}", file=sys.stderr)
+
+    report = {
+        "version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+def _package_version():
+    try:
+        from importlib.metadata import version
+
+        return version("cn-stock-holidays")
+    except Exception:
+        return None
+
+
+if __name__ == "__main__":
+    main()
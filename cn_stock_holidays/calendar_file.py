@@ -0,0 +1,212 @@
+# coding: utf-8
+"""
+Binary calendar files
+
+The text data files (data.txt, data_hk.txt) are the source of truth. Next to each
+of them a binary file (data.bin, data_hk.bin) keeps the parsed holidays and the
+precomputed trading day index. It is opened with mmap, so processes share it
+through the page cache instead of parsing the text file each time. The binary
+file records the sha256 of the text file it was built from, and it is ignored
+when the text file changed.
+
+The binary files shipped with the package are generated at build time by
+scripts/build_calendar_files.py and never written at runtime, so read-only
+installations work and pip keeps track of every file; when one of them is
+stale the text file is parsed. Only the copy in ~/.cn_stock_holidays, which a
+sync replaces, gets its binary file rebuilt by the loader (write_binary).
+"""
+
+import datetime
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from cn_stock_holidays.common import atomic_write, _parse_data, _read_file
+from cn_stock_holidays.trading_index import TradingDayIndex
+
+MAGIC = b"CNSH"
+VERSION = 1
+BINARY_SUFFIX = ".bin"
+
+# magic, version, byte order, sha256 of the text file, first ordinal,
+# number of days, holidays, half-days and sessions
+_HEADER = struct.Struct("<4sHc1x32siiiii")
+
+
+def binary_path(filename):
+    """
+    :param filename: path of a text data file, e.g. .../data.txt
+    :return: path of the binary file next to it, e.g. .../data.bin
+    """
+    return os.path.splitext(filename)[0] + BINARY_SUFFIX
+
+
+def _byte_order():
+    return b"<" if sys.byteorder == "little" else b">"
+
+
+def _pad(size):
+    return -size % 4
+
+
+def _read_digest(filename):
+    return hashlib.sha256(_read_file(filename)).digest()
+
+
+def _parse(data):
+    holidays, half_days = _parse_data(data)
+    return holidays, half_days, TradingDayIndex(holidays, half_days)
+
+
+def write_calendar_file(filename, digest, holidays, half_days, index):
+    """
+    write the binary calendar file for filename, the file is replaced atomically
+    :param filename: path of the text data file
+    :param digest: sha256 digest of the text data file
+    :param holidays: set of datetime.date
+    :param half_days: set of datetime.date
+    :param index: TradingDayIndex built from holidays and half_days
+    """
+    holiday_ordinals = array("i", sorted(d.toordinal() for d in holidays))
+    half_day_ordinals = array("i", sorted(d.toordinal() for d in half_days))
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        _byte_order(),
+        digest,
+        index.first,
+        len(index.days),
+        len(holiday_ordinals),
+        len(half_day_ordinals),
+        len(index.sessions),
+    )
+
+    with atomic_write(binary_path(filename)) as f:
+        f.write(header)
+        f.write(bytes(index.days))
+        f.write(b"\0" * _pad(len(index.days)))
+        f.write(holiday_ordinals.tobytes())
+        f.write(half_day_ordinals.tobytes())
+        f.write(array("i", index.sessions).tobytes())
+        f.write(array("i", index.positions).tobytes())
+
+
+def read_calendar_file(filename, digest):
+    """
+    map the binary calendar file for filename
+    :param filename: path of the text data file
+    :param digest: sha256 digest of the text data file
+    :return: (holidays, half_days, index), or None if the binary file is missing,
+        invalid or built from another version of the text file
+    """
+    try:
+        with open(binary_path(filename), "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(buf) < _HEADER.size:
+        return None
+    (
+        magic,
+        version,
+        byte_order,
+        file_digest,
+        first,
+        n_days,
+        n_holidays,
+        n_half_days,
+        n_sessions,
+    ) = _HEADER.unpack_from(buf)
+    if (magic, version, byte_order, file_digest) != (
+        MAGIC,
+        VERSION,
+        _byte_order(),
+        digest,
+    ):
+        return None
+
+    view = memoryview(buf)
+    offset = _HEADER.size
+    days = view[offset : offset + n_days]
+    offset += n_days + _pad(n_days)
+    tables = []
+    for size in (n_holidays, n_half_days, n_sessions, n_days + 1):
+        tables.append(view[offset : offset + 4 * size].cast("i"))
+        offset += 4 * size
+    if offset != len(buf):
+        return None
+
+    holiday_ordinals, half_day_ordinals, sessions, positions = tables
+    holidays = set(datetime.date.fromordinal(o) for o in holiday_ordinals)
+    half_days = set(datetime.date.fromordinal(o) for o in half_day_ordinals)
+    # both tables are sorted, so the horizon is the larger of their last values
+    last_dates = holiday_ordinals[-1:].tolist() + half_day_ordinals[-1:].tolist()
+    horizon = max(last_dates) if last_dates else None
+    index = TradingDayIndex.from_buffers(first, days, sessions, positions, horizon)
+    return holidays, half_days, index
+
+
+def load_calendar_file(filename, write_binary=False):
+    """
+    load holidays, half-days and the trading day index for a text data file,
+    from its binary file when it is up to date, otherwise the text file is parsed
+    :param filename: path of the text data file
+    :param write_binary: rebuild a missing or stale binary file after parsing
+        (silently skipped if it can not be written), only for the cache copy
+    :return: (holidays, half_days, index)
+    """
+    data = _read_file(filename)
+    digest = hashlib.sha256(data).digest()
+    calendar = read_calendar_file(filename, digest)
+    if calendar is not None:
+        return calendar
+
+    calendar = _parse(data)
+    if write_binary:
+        try:
+            write_calendar_file(filename, digest, *calendar)
+        except OSError:
+            # keep going with the parsed text file
+            pass
+    return calendar
+
+
+def get_from_file(filename, use_list=False, write_binary=False):
+    """
+    same as common._get_from_file, half-day trading days are treated as holidays
+    for backward compatibility
+    """
+    holidays, half_days, _index = load_calendar_file(filename, write_binary)
+    data = holidays | half_days
+    if use_list:
+        return sorted(data)
+    return data
+
+
+def get_from_file_with_half_day(filename, use_list=False, write_binary=False):
+    """
+    same as common._get_from_file_with_half_day, returns (holidays, half_days)
+    """
+    if not os.path.isfile(filename):
+        return ([], []) if use_list else (set(), set())
+
+    holidays, half_days, _index = load_calendar_file(filename, write_binary)
+    if use_list:
+        return sorted(holidays), sorted(half_days)
+    return holidays, half_days
+
+
+def build_calendar_file(filename):
+    """
+    parse a text data file and (re)write its binary file
+    :param filename: path of the text data file
+    :return: (holidays, half_days, index)
+    """
+    data = _read_file(filename)
+    calendar = _parse(data)
+    write_calendar_file(filename, hashlib.sha256(data).digest(), *calendar)
+    return calendar
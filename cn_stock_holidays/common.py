@@ -1,8 +1,9 @@
+from contextlib import contextmanager
 import datetime
 from functools import wraps
+import os
 import sys
 
-
 if sys.version_info.major == 2:
 
     def function_cache(function):
@@ -30,6 +31,76 @@ else:  # suppose it is 3 or larger
     function_cache = lru_cache(None, typed=True)
 
 
+# seconds between two checks of the data file for changes, see
+# meta_functions.meta_get_snapshot
+FILE_CHECK_INTERVAL = 5
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+@contextmanager
+def atomic_write(path, mode=0o644):
+    """
+    write path through a temporary file in the same directory which replaces
+    path on success, so readers see either the old or the new content
+    :yield: file object opened for writing bytes
+    """
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", dir=os.path.dirname(path) or "."
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """
+    exclusive lock on path shared by all processes of the host, path is created
+    if it does not exist, blocks until the lock is acquired
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            while True:
+                try:
+                    # LK_LOCK gives up after 10 seconds
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
 def int_to_date(d):
     d = str(d)
     return datetime.date(int(d[:4]), int(d[4:6]), int(d[6:]))
@@ -54,30 +125,48 @@ def print_result(s):
     print("")
 
 
-def _get_from_file(filename, use_list=False):
-    with open(filename, "r") as f:
-        data = f.readlines()
-        # Filter out empty lines and comments
-        filtered_data = [
-            i.rstrip("\n") for i in data if i.strip() and not i.strip().startswith("#")
-        ]
-        # Process dates, handling both regular and half-day format
-        processed_data = []
-        for i in filtered_data:
-            if i.endswith(",h"):
-                # For half-day trading days, treat them as regular holidays for backward compatibility
-                processed_data.append(i[:-2])  # Remove ',h' suffix
-            else:
-                processed_data.append(i)
-
-        if use_list:
-            return [int_to_date(str_to_int(i)) for i in processed_data]
+def _parse_data(data):
+    """
+    Parse the content of a data file in one pass.
+    Lines with ',h' suffix (e.g. '20251225,h') are half-day trading days,
+    empty lines and lines starting with '#' are skipped.
+    :param data: bytes
+    :return: a tuple (holidays, half_days) of sets of datetime.date
+    """
+    holidays = set()
+    half_days = set()
+    date = datetime.date
+    for line in data.splitlines():
+        line = line.strip()
+        if not line or line.startswith(b"#"):
+            continue
+        if line.endswith(b",h"):
+            target = half_days
+            line = line[:-2]
         else:
-            return set([int_to_date(str_to_int(i)) for i in processed_data])
+            target = holidays
+        # one int() per line, YYYYMMDD is split arithmetically
+        n = int(line)
+        target.add(date(n // 10000, n // 100 % 100, n % 100))
+    return holidays, half_days
+
+
+def _read_file(filename):
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+def _get_from_file(filename, use_list=False):
+    """
+    Read holidays from a data file, half-day trading days are treated as
+    holidays for backward compatibility.
+    :return: a set, or a sorted list if use_list
+    """
+    holidays, half_days = _parse_data(_read_file(filename))
+    holidays |= half_days
     if use_list:
-        return []
-    else:
-        return set([])
+        return sorted(holidays)
+    return holidays
 
 
 def _get_from_file_with_half_day(filename, use_list=False):
@@ -86,27 +175,12 @@ def _get_from_file_with_half_day(filename, use_list=False):
     Lines with 'h' suffix (e.g., '20251225,h') indicate half-day trading days.
     Returns a tuple: (holidays_set, half_day_set)
     """
-    holidays = set()
-    half_days = set()
-
     try:
-        with open(filename, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-
-                if line.endswith(",h"):
-                    # Half-day trading day
-                    date_str = line[:-2]  # Remove ',h' suffix
-                    half_days.add(int_to_date(str_to_int(date_str)))
-                else:
-                    # Regular holiday
-                    holidays.add(int_to_date(str_to_int(line)))
+        holidays, half_days = _parse_data(_read_file(filename))
     except FileNotFoundError:
-        pass
+        holidays, half_days = set(), set()
 
     if use_list:
-        return list(holidays), list(half_days)
+        return sorted(holidays), sorted(half_days)
     else:
         return holidays, half_days
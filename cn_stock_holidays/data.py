@@ -10,25 +10,78 @@ DATA_FILE_FOR_SHSZ = "data.txt"
 get_local = meta_get_local(data_file_name=DATA_FILE_FOR_SHSZ)
 get_cache_path = meta_get_cache_path(data_file_name=DATA_FILE_FOR_SHSZ)
 
+# SHSZ has no half-day trading, days marked as half days are holidays
+get_snapshot = meta_get_snapshot(
+    get_cache_path=get_cache_path,
+    data_file_name=DATA_FILE_FOR_SHSZ,
+    half_days_are_holidays=True,
+)
+get_cached = meta_get_cached_from_snapshot(get_snapshot=get_snapshot)
+get_holiday_index = meta_get_holiday_index(get_snapshot=get_snapshot)
 
-@function_cache
-def get_cached(use_list=False):
-    return meta_get_cached(get_local=get_local, get_cache_path=get_cache_path)(
-        use_list=False
-    )
-
+get_trading_day_index = meta_get_trading_day_index(get_snapshot=get_snapshot)
+data_horizon = meta_data_horizon(get_trading_day_index=get_trading_day_index)
+days_until_expiry = meta_days_until_expiry(data_horizon=data_horizon)
 
 get_remote_and_cache = meta_get_remote_and_cache(
-    get_cached=get_cached, get_cache_path=get_cache_path
+    get_cached=get_cached,
+    get_cache_path=get_cache_path,
+    data_file_name=DATA_FILE_FOR_SHSZ,
 )
-check_expired = meta_check_expired(get_cached=get_cached)
+check_expired = meta_check_expired(get_cached=get_cached, data_horizon=data_horizon)
 sync_data = meta_sync_data(
     check_expired=check_expired, get_remote_and_cache=get_remote_and_cache
 )
-is_trading_day = meta_is_trading_day(get_cached=get_cached)
-previous_trading_day = meta_previous_trading_day(is_trading_day=is_trading_day)
-next_trading_day = meta_next_trading_day(is_trading_day=is_trading_day)
-trading_days_between = meta_trading_days_between(get_cached=get_cached)
+get_remote_and_cache_async = meta_get_remote_and_cache_async(
+    get_cached=get_cached,
+    get_cache_path=get_cache_path,
+    data_file_name=DATA_FILE_FOR_SHSZ,
+)
+sync_data_async = meta_sync_data_async(
+    check_expired=check_expired, get_remote_and_cache_async=get_remote_and_cache_async
+)
+
+# opt-in, see cn_stock_holidays.refresher
+background_refresher = BackgroundRefresher(
+    days_until_expiry=days_until_expiry,
+    get_remote_and_cache=get_remote_and_cache,
+    name="shsz",
+)
+is_trading_day = meta_is_trading_day(
+    get_cached=get_cached,
+    get_trading_day_index=get_trading_day_index,
+    get_snapshot=get_snapshot,
+)
+previous_trading_day = meta_previous_trading_day(
+    is_trading_day=is_trading_day,
+    get_trading_day_index=get_trading_day_index,
+    get_snapshot=get_snapshot,
+)
+next_trading_day = meta_next_trading_day(
+    is_trading_day=is_trading_day,
+    get_trading_day_index=get_trading_day_index,
+    get_snapshot=get_snapshot,
+)
+shift_trading_days = meta_shift_trading_days(
+    get_trading_day_index=get_trading_day_index
+)
+count_trading_days = meta_count_trading_days(
+    get_trading_day_index=get_trading_day_index
+)
+session_index = meta_session_index(get_trading_day_index=get_trading_day_index)
+session_at = meta_session_at(get_trading_day_index=get_trading_day_index)
+is_trading_day_array = meta_is_trading_day_array(
+    get_trading_day_index=get_trading_day_index
+)
+roll_trading_day_array = meta_roll_trading_day_array(
+    get_trading_day_index=get_trading_day_index
+)
+trading_days_between = meta_trading_days_between(
+    get_cached=get_cached, get_trading_day_index=get_trading_day_index
+)
+trading_days_between_array = meta_trading_days_between_array(
+    get_trading_day_index=get_trading_day_index
+)
 
 if __name__ == "__main__":
     data = check_expired()
@@ -14,31 +14,37 @@ get_cache_path = meta_get_cache_path(data_file_name=DATA_FILE_FOR_HK)
 # Half-day trading support
 get_local_with_half_day = meta_get_local_with_half_day(data_file_name=DATA_FILE_FOR_HK)
 
+# Half-day trading days are trading days, so the index only excludes full holidays
+get_snapshot = meta_get_snapshot(
+    get_cache_path=get_cache_path, data_file_name=DATA_FILE_FOR_HK
+)
+get_cached = meta_get_cached_from_snapshot(get_snapshot=get_snapshot)
+get_holiday_index = meta_get_holiday_index(get_snapshot=get_snapshot)
+get_cached_with_half_day = meta_get_cached_with_half_day_from_snapshot(
+    get_snapshot=get_snapshot
+)
 
-@function_cache
-def get_cached(use_list=False):
-    return meta_get_cached(get_local=get_local, get_cache_path=get_cache_path)(
-        use_list=False
-    )
-
-
-@function_cache
-def get_cached_with_half_day(use_list=False):
-    return meta_get_cached_with_half_day(
-        get_local_with_half_day=get_local_with_half_day, get_cache_path=get_cache_path
-    )(use_list=False)
-
+get_trading_day_index = meta_get_trading_day_index(get_snapshot=get_snapshot)
+data_horizon = meta_data_horizon(get_trading_day_index=get_trading_day_index)
+days_until_expiry = meta_days_until_expiry(data_horizon=data_horizon)
 
 get_remote_and_cache = meta_get_remote_and_cache(
-    get_cached=get_cached, get_cache_path=get_cache_path
+    get_cached=get_cached,
+    get_cache_path=get_cache_path,
+    data_file_name=DATA_FILE_FOR_HK,
 )
-check_expired = meta_check_expired(get_cached=get_cached)
+check_expired = meta_check_expired(get_cached=get_cached, data_horizon=data_horizon)
 sync_data = meta_sync_data(
     check_expired=check_expired, get_remote_and_cache=get_remote_and_cache
 )
-is_trading_day = meta_is_trading_day(get_cached=get_cached)
-previous_trading_day = meta_previous_trading_day(is_trading_day=is_trading_day)
-next_trading_day = meta_next_trading_day(is_trading_day=is_trading_day)
+get_remote_and_cache_async = meta_get_remote_and_cache_async(
+    get_cached=get_cached,
+    get_cache_path=get_cache_path,
+    data_file_name=DATA_FILE_FOR_HK,
+)
+sync_data_async = meta_sync_data_async(
+    check_expired=check_expired, get_remote_and_cache_async=get_remote_and_cache_async
+)
 
 # Half-day trading functions
 get_remote_and_cache_with_half_day = meta_get_remote_and_cache_with_half_day(
@@ -47,46 +53,73 @@ get_remote_and_cache_with_half_day = meta_get_remote_and_cache_with_half_day(
     data_file_name=DATA_FILE_FOR_HK,
 )
 check_expired_with_half_day = meta_check_expired_with_half_day(
-    get_cached_with_half_day=get_cached_with_half_day
+    get_cached_with_half_day=get_cached_with_half_day, data_horizon=data_horizon
 )
 sync_data_with_half_day = meta_sync_data_with_half_day(
     check_expired_with_half_day=check_expired_with_half_day,
     get_remote_and_cache_with_half_day=get_remote_and_cache_with_half_day,
 )
+get_remote_and_cache_with_half_day_async = (
+    meta_get_remote_and_cache_with_half_day_async(
+        get_cached_with_half_day=get_cached_with_half_day,
+        get_cache_path=get_cache_path,
+        data_file_name=DATA_FILE_FOR_HK,
+    )
+)
+sync_data_with_half_day_async = meta_sync_data_with_half_day_async(
+    check_expired_with_half_day=check_expired_with_half_day,
+    get_remote_and_cache_with_half_day_async=get_remote_and_cache_with_half_day_async,
+)
+
+# opt-in, see cn_stock_holidays.refresher
+background_refresher = BackgroundRefresher(
+    days_until_expiry=days_until_expiry,
+    get_remote_and_cache=get_remote_and_cache,
+    name="hk",
+)
 is_half_day_trading_day = meta_is_half_day_trading_day(
-    get_cached_with_half_day=get_cached_with_half_day
-)
-
-
-# Override is_trading_day for HK to treat both normal and half-day trading days as trading days
-def is_trading_day(dt):
-    if type(dt) is datetime.datetime:
-        dt = dt.date()
-    if dt.weekday() >= 5:
-        return False
-    holidays, _half_days = get_cached_with_half_day()
-    if dt in holidays:
-        return False
-    return True
-
-
-is_trading_day.cache_clear = lambda: get_cached_with_half_day.cache_clear()
-
-
-# Override trading_days_between for HK to treat both normal and half-day trading days as trading days
-def trading_days_between(start, end):
-    if type(start) is datetime.datetime:
-        start = start.date()
-    if type(end) is datetime.datetime:
-        end = end.date()
-    holidays, _half_days = get_cached_with_half_day()
-    if start > end:
-        return
-    curdate = start
-    while curdate <= end:
-        if curdate.weekday() < 5 and curdate not in holidays:
-            yield curdate
-        curdate = curdate + datetime.timedelta(days=1)
+    get_cached_with_half_day=get_cached_with_half_day,
+    get_trading_day_index=get_trading_day_index,
+    get_snapshot=get_snapshot,
+)
+
+# HK treats both normal and half-day trading days as trading days
+is_trading_day = meta_is_trading_day(
+    get_cached=get_cached,
+    get_trading_day_index=get_trading_day_index,
+    get_snapshot=get_snapshot,
+)
+
+previous_trading_day = meta_previous_trading_day(
+    is_trading_day=is_trading_day,
+    get_trading_day_index=get_trading_day_index,
+    get_snapshot=get_snapshot,
+)
+next_trading_day = meta_next_trading_day(
+    is_trading_day=is_trading_day,
+    get_trading_day_index=get_trading_day_index,
+    get_snapshot=get_snapshot,
+)
+shift_trading_days = meta_shift_trading_days(
+    get_trading_day_index=get_trading_day_index
+)
+count_trading_days = meta_count_trading_days(
+    get_trading_day_index=get_trading_day_index
+)
+session_index = meta_session_index(get_trading_day_index=get_trading_day_index)
+session_at = meta_session_at(get_trading_day_index=get_trading_day_index)
+is_trading_day_array = meta_is_trading_day_array(
+    get_trading_day_index=get_trading_day_index
+)
+roll_trading_day_array = meta_roll_trading_day_array(
+    get_trading_day_index=get_trading_day_index
+)
+trading_days_between = meta_trading_days_between(
+    get_cached=get_cached, get_trading_day_index=get_trading_day_index
+)
+trading_days_between_array = meta_trading_days_between_array(
+    get_trading_day_index=get_trading_day_index
+)
 
 
 if __name__ == "__main__":
@@ -2,17 +2,31 @@
 
 
 import datetime
-import logging
 import os
-import requests
+import threading
 from cn_stock_holidays.common import (
+    FILE_CHECK_INTERVAL,
     function_cache,
     int_to_date,
     print_result,
-    _get_from_file,
-    _get_from_file_with_half_day,
+    _file_stamp,
 )
+from cn_stock_holidays.calendar_file import (
+    get_from_file,
+    get_from_file_with_half_day,
+)
+from cn_stock_holidays.refresher import BackgroundRefresher
+from cn_stock_holidays.remote import (
+    REQUEST_TIMEOUT,
+    data_url,
+    fetch_to_cache,
+    fetch_to_cache_async,
+)
+from cn_stock_holidays.snapshot import CalendarSnapshot
+from cn_stock_holidays.trading_index import HALF_DAY, TradingDayIndex
 
+# requests and logging are imported inside the functions which sync data, so that
+# importing this package for trading day lookups does not pay for them at startup
 
 # meta func is not a good design, but for backward compatibility for data version and create similar logic for hk,
 # we did it
@@ -25,7 +39,7 @@ def meta_get_local(data_file_name="data.txt"):
         :return: a list contains all holiday data, element with datatime.date format
         """
         datafilepath = os.path.join(os.path.dirname(__file__), data_file_name)
-        return _get_from_file(datafilepath, use_list)
+        return get_from_file(datafilepath, use_list)
 
     return get_local
 
@@ -37,7 +51,7 @@ def meta_get_local_with_half_day(data_file_name="data.txt"):
         :return: a tuple (holidays, half_days) where both are sets/lists of datetime.date
         """
         datafilepath = os.path.join(os.path.dirname(__file__), data_file_name)
-        return _get_from_file_with_half_day(datafilepath, use_list)
+        return get_from_file_with_half_day(datafilepath, use_list)
 
     return get_local_with_half_day
 
@@ -52,7 +66,7 @@ def meta_get_cached(get_local, get_cache_path):
         cache_path = get_cache_path()
 
         if os.path.isfile(cache_path):
-            return _get_from_file(cache_path, use_list)
+            return get_from_file(cache_path, use_list, write_binary=True)
         else:
             return get_local(use_list=False)
 
@@ -69,28 +83,226 @@ def meta_get_cached_with_half_day(get_local_with_half_day, get_cache_path):
         cache_path = get_cache_path()
 
         if os.path.isfile(cache_path):
-            return _get_from_file_with_half_day(cache_path, use_list)
+            return get_from_file_with_half_day(cache_path, use_list, write_binary=True)
         else:
             return get_local_with_half_day(use_list=False)
 
     return get_cached_with_half_day
 
 
-def meta_get_remote_and_cache(get_cached, get_cache_path):
-    def get_remote_and_cache():
+def meta_get_snapshot(
+    get_cache_path,
+    data_file_name="data.txt",
+    half_days_are_holidays=False,
+    check_interval=FILE_CHECK_INTERVAL,
+):
+    lock = threading.Lock()
+    # "check" is set when the next lookup has to go through get_snapshot: before
+    # the first load, and when a timer marks a check of the cache file as due,
+    # so other lookups neither read the clock nor stat the file
+    state = {"snapshot": None, "check": True, "timer": None}
+
+    def check_due():
+        state["check"] = True
+
+    def schedule_check():
         """
-        get newest data file from network and cache on local machine
-        :return: a list contains all holiday data, element with datatime.date format
+        clear the check flag and start the timer which sets it again after
+        check_interval seconds, 0 keeps it set so that every lookup checks
         """
-        response = requests.get(
-            "https://raw.githubusercontent.com/rainx/cn_stock_holidays/main/cn_stock_holidays/data.txt"
-        )
+        interval = get_snapshot.check_interval
+        if interval == 0:
+            return
+        state["check"] = False
+        timer = state["timer"]
+        if interval is None or (timer is not None and timer.is_alive()):
+            return
+        timer = threading.Timer(interval, check_due)
+        timer.daemon = True
+        try:
+            timer.start()
+        except BaseException:
+            state["check"] = True
+            raise
+        state["timer"] = timer
+
+    def load():
         cache_path = get_cache_path()
+        stamp = _file_stamp(cache_path)
+        if stamp is not None:
+            path = cache_path
+        else:
+            path = os.path.join(os.path.dirname(__file__), data_file_name)
+        # only the cache copy gets its binary file rebuilt, the package data
+        # directory may be read-only
+        snapshot = CalendarSnapshot.from_file(
+            path, stamp, half_days_are_holidays, write_binary=stamp is not None
+        )
+        # a single reference assignment publishes the new snapshot to all threads
+        state["snapshot"] = snapshot
+        return snapshot
+
+    def reload():
+        try:
+            load()
+        except Exception as e:
+            import logging
+
+            logging.getLogger(__name__).warning("reloading holiday data failed: %r", e)
+        finally:
+            lock.release()
+
+    def check():
+        if state["snapshot"] is None:
+            with lock:
+                if state["snapshot"] is None:
+                    load()
+                    schedule_check()
+            return
+
+        if not lock.acquire(blocking=False):
+            # another thread checks the file or reloads it
+            return
+        # the lock is held until the reload is done, so one runs at a time
+        reloading = False
+        try:
+            if state["check"]:
+                schedule_check()
+                if (
+                    get_snapshot.check_interval is not None
+                    and _file_stamp(get_cache_path()) != state["snapshot"].stamp
+                ):
+                    threading.Thread(
+                        target=reload, name="cn_stock_holidays reload", daemon=True
+                    ).start()
+                    # the started thread releases the lock
+                    reloading = True
+        finally:
+            if not reloading:
+                lock.release()
+
+    def get_snapshot():
+        """
+        get the current CalendarSnapshot of the cached data (or the package data
+        file if there is no cache), the first call loads it and the following
+        ones only return it.
+
+        The cache file is checked with os.stat once a timer marked the check as
+        due, check_interval seconds after the last one. The interval can be
+        changed by setting the check_interval attribute, it is used from the
+        next check on, None disables checking (call refresh to start again).
+        When the file changed, the new snapshot is loaded in a background
+        thread, readers keep getting the current one until it is published.
+        :return: CalendarSnapshot
+        """
+        if state["check"]:
+            check()
+        return state["snapshot"]
+
+    def refresh():
+        """
+        load a new snapshot now, readers keep the current one until it is ready
+        :return: CalendarSnapshot
+        """
+        with lock:
+            snapshot = load()
+        # the next lookup checks the file again with the current check_interval
+        state["check"] = True
+        return snapshot
+
+    def wait(timeout=None):
+        """
+        wait for a reload started by get_snapshot to be published
+        :param timeout: seconds, None waits until it is done
+        :return: CalendarSnapshot
+        """
+        if lock.acquire(timeout=-1 if timeout is None else timeout):
+            lock.release()
+        return state["snapshot"]
+
+    def after_fork():
+        nonlocal lock
+        # the timer and a reload holding the lock are not copied to the child
+        lock = threading.Lock()
+        state["timer"] = None
+        state["check"] = True
+
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=after_fork)
 
-        with open(cache_path, "wb") as f:
-            f.write(response.content)
+    get_snapshot.check_interval = check_interval
+    get_snapshot.refresh = refresh
+    get_snapshot.wait = wait
+    # read by the scalar lookups, which only call get_snapshot when "check" is set
+    get_snapshot.state = state
+    return get_snapshot
 
-        get_cached.cache_clear()
+
+def meta_get_cached_from_snapshot(get_snapshot):
+    def get_cached(use_list=False):
+        """
+        get from cache version, if it is not exising, use txt file in package data
+        :return: a set contains all holiday data, element with datatime.date format,
+            half-day trading days are included, the set is shared and must not be modified
+        """
+        return get_snapshot().days_off
+
+    get_cached.cache_clear = get_snapshot.refresh
+    return get_cached
+
+
+def meta_get_cached_with_half_day_from_snapshot(get_snapshot):
+    def get_cached_with_half_day(use_list=False):
+        """
+        get from cache version with half-day trading support, if it is not existing, use txt file in package data
+        :return: a tuple (holidays, half_days) where both are sets of datetime.date,
+            the sets are shared and must not be modified
+        """
+        return get_snapshot().with_half_day
+
+    get_cached_with_half_day.cache_clear = get_snapshot.refresh
+    return get_cached_with_half_day
+
+
+def meta_get_holiday_index(get_snapshot):
+    # (snapshot, index) replaced as one reference, the index is built again
+    # only when get_snapshot returns another snapshot
+    state = {"entry": (None, None)}
+
+    def get_holiday_index():
+        """
+        the days of get_cached as a sorted DatetimeIndex at midnight UTC, e.g. for
+        the adhoc_holidays of the zipline calendars, requires pandas
+        :return: pandas.DatetimeIndex, it is shared and built once per data snapshot
+        """
+        snapshot = get_snapshot()
+        cached_snapshot, index = state["entry"]
+        if cached_snapshot is not snapshot:
+            import numpy as np
+            import pandas as pd
+
+            days = np.array(sorted(snapshot.days_off), dtype="datetime64[D]")
+            index = pd.DatetimeIndex(days.astype("datetime64[ns]")).tz_localize("UTC")
+            state["entry"] = (snapshot, index)
+        return index
+
+    get_holiday_index.cache_clear = get_snapshot.refresh
+    return get_holiday_index
+
+
+def meta_get_remote_and_cache(get_cached, get_cache_path, data_file_name="data.txt"):
+    def get_remote_and_cache(session=None, timeout=REQUEST_TIMEOUT):
+        """
+        get newest data file from network and cache on local machine, the data
+        is only reloaded when the downloaded file differs from the cached one
+        :param session: requests.Session to reuse pooled connections
+        :param timeout: requests timeout in seconds, a number or (connect, read)
+        :return: a list contains all holiday data, element with datatime.date format
+        """
+        if fetch_to_cache(
+            data_url(data_file_name), get_cache_path(), session=session, timeout=timeout
+        ):
+            get_cached.cache_clear()
 
         return get_cached()
 
@@ -100,34 +312,91 @@ def meta_get_remote_and_cache(get_cached, get_cache_path):
 def meta_get_remote_and_cache_with_half_day(
     get_cached_with_half_day, get_cache_path, data_file_name="data.txt"
 ):
-    def get_remote_and_cache_with_half_day():
+    def get_remote_and_cache_with_half_day(session=None, timeout=REQUEST_TIMEOUT):
         """
         get newest data file from network and cache on local machine with half-day trading support
+        :param session: requests.Session to reuse pooled connections
+        :param timeout: requests timeout in seconds, a number or (connect, read)
         :return: a tuple (holidays, half_days) where both are sets of datetime.date
         """
-        response = requests.get(
-            f"https://raw.githubusercontent.com/rainx/cn_stock_holidays/main/cn_stock_holidays/{data_file_name}"
+        if fetch_to_cache(
+            data_url(data_file_name), get_cache_path(), session=session, timeout=timeout
+        ):
+            get_cached_with_half_day.cache_clear()
+
+        return get_cached_with_half_day()
+
+    return get_remote_and_cache_with_half_day
+
+
+def meta_get_remote_and_cache_async(
+    get_cached, get_cache_path, data_file_name="data.txt"
+):
+    async def get_remote_and_cache_async(session=None, timeout=REQUEST_TIMEOUT):
+        """
+        get_remote_and_cache for asyncio, the download and the parsing of the
+        new data run in the default executor, so the event loop is not blocked
+        :param session: requests.Session to reuse pooled connections
+        :param timeout: requests timeout in seconds, a number or (connect, read)
+        :return: a list contains all holiday data, element with datatime.date format
+        """
+        import asyncio
+
+        changed = await fetch_to_cache_async(
+            data_url(data_file_name), get_cache_path(), session=session, timeout=timeout
         )
-        cache_path = get_cache_path()
 
-        with open(cache_path, "wb") as f:
-            f.write(response.content)
+        def reload():
+            if changed:
+                get_cached.cache_clear()
+            return get_cached()
 
-        get_cached_with_half_day.cache_clear()
+        return await asyncio.get_running_loop().run_in_executor(None, reload)
 
-        return get_cached_with_half_day()
+    return get_remote_and_cache_async
 
-    return get_remote_and_cache_with_half_day
 
+def meta_get_remote_and_cache_with_half_day_async(
+    get_cached_with_half_day, get_cache_path, data_file_name="data.txt"
+):
+    async def get_remote_and_cache_with_half_day_async(
+        session=None, timeout=REQUEST_TIMEOUT
+    ):
+        """
+        get_remote_and_cache_with_half_day for asyncio, the download and the
+        parsing of the new data run in the default executor
+        :param session: requests.Session to reuse pooled connections
+        :param timeout: requests timeout in seconds, a number or (connect, read)
+        :return: a tuple (holidays, half_days) where both are sets of datetime.date
+        """
+        import asyncio
+
+        changed = await fetch_to_cache_async(
+            data_url(data_file_name), get_cache_path(), session=session, timeout=timeout
+        )
+
+        def reload():
+            if changed:
+                get_cached_with_half_day.cache_clear()
+            return get_cached_with_half_day()
 
-def meta_check_expired(get_cached):
+        return await asyncio.get_running_loop().run_in_executor(None, reload)
+
+    return get_remote_and_cache_with_half_day_async
+
+
+def meta_check_expired(get_cached, data_horizon=None):
     def check_expired():
         """
         check if local or cached data need update
         :return: true/false
         """
-        data = get_cached()
         now = datetime.datetime.now().date()
+        if data_horizon is not None:
+            horizon = data_horizon()
+            return horizon is None or horizon <= now
+
+        data = get_cached()
         for d in data:
             if d > now:
                 return False
@@ -136,14 +405,18 @@ def meta_check_expired(get_cached):
     return check_expired
 
 
-def meta_check_expired_with_half_day(get_cached_with_half_day):
+def meta_check_expired_with_half_day(get_cached_with_half_day, data_horizon=None):
     def check_expired_with_half_day():
         """
         check if local or cached data need update with half-day trading support
         :return: true/false
         """
-        holidays, half_days = get_cached_with_half_day()
         now = datetime.datetime.now().date()
+        if data_horizon is not None:
+            horizon = data_horizon()
+            return horizon is None or horizon <= now
+
+        holidays, half_days = get_cached_with_half_day()
 
         # Check holidays
         for d in holidays:
@@ -159,8 +432,40 @@ def meta_check_expired_with_half_day(get_cached_with_half_day):
     return check_expired_with_half_day
 
 
+def meta_data_horizon(get_trading_day_index):
+    def data_horizon():
+        """
+        the last date covered by the holiday data, it is recorded when the data
+        is loaded, so the call costs no more than a dict lookup
+        :return: datetime.date, or None if there is no holiday data
+        """
+        horizon = get_trading_day_index().horizon
+        if horizon is None:
+            return None
+        return datetime.date.fromordinal(horizon)
+
+    return data_horizon
+
+
+def meta_days_until_expiry(data_horizon):
+    def days_until_expiry():
+        """
+        number of days until the holiday data expires, sync_data fetches new
+        data once it is 0 or less
+        :return: int, or None if there is no holiday data
+        """
+        horizon = data_horizon()
+        if horizon is None:
+            return None
+        return (horizon - datetime.datetime.now().date()).days
+
+    return days_until_expiry
+
+
 def meta_sync_data(check_expired, get_remote_and_cache):
     def sync_data():
+        import logging
+
         logging.basicConfig(level=logging.INFO)
         if check_expired():
             logging.info("trying to fetch data...")
@@ -176,6 +481,8 @@ def meta_sync_data_with_half_day(
     check_expired_with_half_day, get_remote_and_cache_with_half_day
 ):
     def sync_data_with_half_day():
+        import logging
+
         logging.basicConfig(level=logging.INFO)
         if check_expired_with_half_day():
             logging.info("trying to fetch data...")
@@ -187,6 +494,50 @@ def meta_sync_data_with_half_day(
     return sync_data_with_half_day
 
 
+def meta_sync_data_async(check_expired, get_remote_and_cache_async):
+    async def sync_data_async():
+        """
+        sync_data for asyncio
+        :return: True if data was fetched, False if the local data is not expired
+        """
+        import asyncio
+        import logging
+
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, check_expired):
+            logging.info("trying to fetch data...")
+            await get_remote_and_cache_async()
+            logging.info("done")
+            return True
+        logging.info("local data is not expired, do not fetch new data")
+        return False
+
+    return sync_data_async
+
+
+def meta_sync_data_with_half_day_async(
+    check_expired_with_half_day, get_remote_and_cache_with_half_day_async
+):
+    async def sync_data_with_half_day_async():
+        """
+        sync_data_with_half_day for asyncio
+        :return: True if data was fetched, False if the local data is not expired
+        """
+        import asyncio
+        import logging
+
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, check_expired_with_half_day):
+            logging.info("trying to fetch data...")
+            await get_remote_and_cache_with_half_day_async()
+            logging.info("done")
+            return True
+        logging.info("local data is not expired, do not fetch new data")
+        return False
+
+    return sync_data_with_half_day_async
+
+
 def meta_get_cache_path(data_file_name="data.txt"):
     def get_cache_path():
         usr_home = os.path.expanduser("~")
@@ -198,16 +549,54 @@ def meta_get_cache_path(data_file_name="data.txt"):
     return get_cache_path
 
 
-def meta_is_trading_day(get_cached):
-    def is_trading_day(dt):
-        if dt is None:
-            raise TypeError("Date cannot be None")
+def _to_date(dt):
+    """
+    :param dt: datetime.date or datetime.datetime
+    :return: datetime.date, the date of dt for datetime.datetime
+    :raises TypeError: if dt is not a date
+    """
+    if dt is None:
+        raise TypeError("Date cannot be None")
 
-        if not isinstance(dt, (datetime.date, datetime.datetime)):
-            raise TypeError("Date must be datetime.date or datetime.datetime")
+    if not isinstance(dt, datetime.date):
+        raise TypeError("Date must be datetime.date or datetime.datetime")
 
-        if type(dt) is datetime.datetime:
-            dt = dt.date()
+    if type(dt) is datetime.datetime:
+        return dt.date()
+    return dt
+
+
+def meta_is_trading_day(get_cached, get_trading_day_index=None, get_snapshot=None):
+    date = datetime.date
+
+    if get_snapshot is not None:
+        state = get_snapshot.state
+
+        def is_trading_day(dt):
+            if type(dt) is not date:
+                dt = _to_date(dt)
+
+            # TradingDayIndex.is_trading_day inlined on the published snapshot,
+            # get_snapshot is only called when a check of the data file is due
+            if state["check"]:
+                get_snapshot()
+            index = state["snapshot"].index
+            o = dt.toordinal()
+            k = o - index.first
+            days = index.days
+            if 0 <= k < len(days):
+                return days[k] != 0
+            return (o - 1) % 7 < 5
+
+        # reloads the holiday data the lookups are based on
+        is_trading_day.cache_clear = get_snapshot.refresh
+        return is_trading_day
+
+    def is_trading_day(dt):
+        dt = _to_date(dt)
+
+        if get_trading_day_index is not None:
+            return get_trading_day_index().is_trading_day(dt)
 
         if dt.weekday() >= 5:
             return False
@@ -216,24 +605,50 @@ def meta_is_trading_day(get_cached):
             return False
         return True
 
+    # reloads the holiday data the lookups are based on
+    if hasattr(get_trading_day_index, "cache_clear"):
+        is_trading_day.cache_clear = get_trading_day_index.cache_clear
     return is_trading_day
 
 
-def meta_is_half_day_trading_day(get_cached_with_half_day):
+def meta_is_half_day_trading_day(
+    get_cached_with_half_day, get_trading_day_index=None, get_snapshot=None
+):
+    date = datetime.date
+
+    if get_snapshot is not None:
+        state = get_snapshot.state
+
+        def is_half_day_trading_day(dt):
+            """
+            Check if a given date is a half-day trading day
+            :param dt: datetime.date or datetime.datetime
+            :return: True if it's a half-day trading day, False otherwise
+            """
+            if type(dt) is not date:
+                dt = _to_date(dt)
+
+            if state["check"]:
+                get_snapshot()
+            index = state["snapshot"].index
+            k = dt.toordinal() - index.first
+            days = index.days
+            if 0 <= k < len(days):
+                return days[k] & HALF_DAY != 0
+            return False
+
+        return is_half_day_trading_day
+
     def is_half_day_trading_day(dt):
         """
         Check if a given date is a half-day trading day
         :param dt: datetime.date or datetime.datetime
         :return: True if it's a half-day trading day, False otherwise
         """
-        if dt is None:
-            raise TypeError("Date cannot be None")
+        dt = _to_date(dt)
 
-        if not isinstance(dt, (datetime.date, datetime.datetime)):
-            raise TypeError("Date must be datetime.date or datetime.datetime")
-
-        if type(dt) is datetime.datetime:
-            dt = dt.date()
+        if get_trading_day_index is not None:
+            return get_trading_day_index().is_half_day_trading_day(dt)
 
         if dt.weekday() >= 5:
             return False
@@ -247,11 +662,67 @@ def meta_is_half_day_trading_day(get_cached_with_half_day):
     return is_half_day_trading_day
 
 
-def meta_previous_trading_day(is_trading_day):
+def meta_get_trading_day_index(get_snapshot):
+    def get_trading_day_index():
+        """
+        get the precomputed trading day index, it is rebuilt only when the cached
+        holiday data changes (e.g. after cache_clear or a remote sync)
+        :return: TradingDayIndex
+        """
+        return get_snapshot().index
+
+    get_trading_day_index.cache_clear = get_snapshot.refresh
+    return get_trading_day_index
+
+
+def meta_is_trading_day_array(get_trading_day_index):
+    def is_trading_day_array(values):
+        """
+        vectorized is_trading_day, requires numpy
+        :param values: datetime64 array, pandas DatetimeIndex / Series, or a list of datetime.date
+        :return: a bool numpy array with the same length as values
+        """
+        return get_trading_day_index().is_trading_day_array(values)
+
+    return is_trading_day_array
+
+
+def meta_roll_trading_day_array(get_trading_day_index):
+    def roll_trading_day_array(values, direction="forward"):
+        """
+        vectorized roll of dates to trading days, requires numpy
+        :param values: datetime64 array, pandas DatetimeIndex / Series, or a list of datetime.date
+        :param direction: "forward", "backward" or "nearest" (forward on a tie),
+            dates which are already trading days are kept
+        :return: a datetime64[D] numpy array with the same length as values
+        """
+        return get_trading_day_index().roll_array(values, direction)
+
+    return roll_trading_day_array
+
+
+def meta_previous_trading_day(
+    is_trading_day, get_trading_day_index=None, get_snapshot=None
+):
+    if get_snapshot is not None:
+        state = get_snapshot.state
+
     def previous_trading_day(dt):
         if type(dt) is datetime.datetime:
             dt = dt.date()
 
+        if get_snapshot is not None:
+            if state["check"]:
+                get_snapshot()
+            result = state["snapshot"].index.previous_trading_day(dt)
+            if result is not None:
+                return result
+        elif get_trading_day_index is not None:
+            result = get_trading_day_index().previous_trading_day(dt)
+            if result is not None:
+                return result
+
+        # outside of the holiday data range, walk day by day
         while True:
             dt = dt - datetime.timedelta(days=1)
             if is_trading_day(dt):
@@ -260,11 +731,28 @@ def meta_previous_trading_day(is_trading_day):
     return previous_trading_day
 
 
-def meta_next_trading_day(is_trading_day):
+def meta_next_trading_day(
+    is_trading_day, get_trading_day_index=None, get_snapshot=None
+):
+    if get_snapshot is not None:
+        state = get_snapshot.state
+
     def next_trading_day(dt):
         if type(dt) is datetime.datetime:
             dt = dt.date()
 
+        if get_snapshot is not None:
+            if state["check"]:
+                get_snapshot()
+            result = state["snapshot"].index.next_trading_day(dt)
+            if result is not None:
+                return result
+        elif get_trading_day_index is not None:
+            result = get_trading_day_index().next_trading_day(dt)
+            if result is not None:
+                return result
+
+        # outside of the holiday data range, walk day by day
         while True:
             dt = dt + datetime.timedelta(days=1)
             if is_trading_day(dt):
@@ -273,7 +761,71 @@ def meta_next_trading_day(is_trading_day):
     return next_trading_day
 
 
-def meta_trading_days_between(get_cached):
+def meta_shift_trading_days(get_trading_day_index):
+    def shift_trading_days(dt, n):
+        """
+        move n trading days forward (n > 0) or backward (n < 0) from dt
+        :param dt: datetime.date or datetime.datetime
+        :param n: int, shift(dt, 1) equals next_trading_day(dt), shift(dt, -1) equals previous_trading_day(dt)
+        :return: datetime.date
+        :raises ValueError: if dt or the result is after data_horizon(), the last
+            listed holiday, or before the start of the data
+        """
+        if type(dt) is datetime.datetime:
+            dt = dt.date()
+
+        return get_trading_day_index().shift_trading_days(dt, n)
+
+    return shift_trading_days
+
+
+def meta_count_trading_days(get_trading_day_index):
+    def count_trading_days(start, end):
+        """
+        count trading days between start and end (both inclusive), it gives the same
+        result as len(list(trading_days_between(start, end))) without iterating days
+        :param start: datetime.date or datetime.datetime
+        :param end: datetime.date or datetime.datetime
+        :return: int
+        """
+        if type(start) is datetime.datetime:
+            start = start.date()
+
+        if type(end) is datetime.datetime:
+            end = end.date()
+
+        return get_trading_day_index().count_trading_days(start, end)
+
+    return count_trading_days
+
+
+def meta_session_index(get_trading_day_index):
+    def session_index(dt):
+        """
+        map trading days to dense 0-based session numbers
+        :param dt: datetime.date/datetime.datetime, a list of them, or a datetime64 array / DatetimeIndex / Series
+        :return: int, a list of int, or an int numpy array for array inputs
+        :raises ValueError: if a date is not a trading day inside the holiday data range
+        """
+        return get_trading_day_index().session_index(dt)
+
+    return session_index
+
+
+def meta_session_at(get_trading_day_index):
+    def session_at(i):
+        """
+        map 0-based session numbers back to trading days, the inverse of session_index
+        :param i: int, a list of int, or an int numpy array
+        :return: datetime.date, a list of datetime.date, or a datetime64[D] numpy array for array inputs
+        :raises IndexError: if a session number is out of range
+        """
+        return get_trading_day_index().session_at(i)
+
+    return session_at
+
+
+def meta_trading_days_between(get_cached, get_trading_day_index=None):
     def trading_days_between(start, end):
         if type(start) is datetime.datetime:
             start = start.date()
@@ -281,6 +833,11 @@ def meta_trading_days_between(get_cached):
         if type(end) is datetime.datetime:
             end = end.date()
 
+        if get_trading_day_index is not None:
+            for d in get_trading_day_index().iter_trading_days(start, end):
+                yield d
+            return
+
         dataset = get_cached()
         if start > end:
             return
@@ -291,3 +848,24 @@ def meta_trading_days_between(get_cached):
             curdate = curdate + datetime.timedelta(days=1)
 
     return trading_days_between
+
+
+def meta_trading_days_between_array(get_trading_day_index):
+    def trading_days_between_array(start, end):
+        """
+        trading days between start and end (both inclusive) in one array instead of a generator
+        :param start: datetime.date or datetime.datetime
+        :param end: datetime.date or datetime.datetime
+        :return: a read-only datetime64[D] numpy array, sliced from the precomputed session
+            array without copy inside the holiday data range, or a list of datetime.date
+            when numpy is not installed
+        """
+        if type(start) is datetime.datetime:
+            start = start.date()
+
+        if type(end) is datetime.datetime:
+            end = end.date()
+
+        return get_trading_day_index().trading_days_between_array(start, end)
+
+    return trading_days_between_array
@@ -0,0 +1,162 @@
+# coding: utf-8
+"""
+Opt-in background refresh of the holiday data for long running services
+
+    import cn_stock_holidays.data as shsz
+
+    shsz.background_refresher.start(interval=3600)
+    # or, in an asyncio application
+    task = asyncio.create_task(shsz.background_refresher.run_async(interval=3600))
+
+The refresher checks the data horizon on a schedule and downloads new data
+when it is about to expire. The download runs in a daemon thread (or a worker
+thread of the event loop), and the new data is published by swapping the
+calendar snapshot, so lookups never wait for it.
+"""
+
+import threading
+import time
+
+# seconds between two checks of the data horizon
+REFRESH_INTERVAL = 3600
+
+
+class BackgroundRefresher(object):
+    """
+    refresh the holiday data of one market in the background
+
+    status() returns the counters of the checks, with the time of the last
+    success and of the last failure.
+    """
+
+    def __init__(self, days_until_expiry, get_remote_and_cache, name=None):
+        """
+        :param days_until_expiry: function returning the days left before the data expires
+        :param get_remote_and_cache: function downloading and publishing new data
+        :param name: market name used for the thread name
+        """
+        self.days_until_expiry = days_until_expiry
+        self.get_remote_and_cache = get_remote_and_cache
+        self.name = name
+        # one refresh at a time, the counters are read without it
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.checks = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_check = None
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+
+    def refresh_once(self, min_days_left=0, timeout=None):
+        """
+        download new data if it expires within min_days_left days, errors are
+        recorded in the counters instead of being raised
+        :param min_days_left: 0 refreshes when check_expired() is True, larger
+            values refresh earlier
+        :param timeout: requests timeout in seconds, the default of
+            get_remote_and_cache if None
+        :return: True if new data was fetched, False if the data is not
+            expiring, None if the refresh failed
+        """
+        with self._refresh_lock:
+            self.checks += 1
+            self.last_check = time.time()
+            try:
+                days = self.days_until_expiry()
+                if days is not None and days > min_days_left:
+                    return False
+                if timeout is None:
+                    self.get_remote_and_cache()
+                else:
+                    self.get_remote_and_cache(timeout=timeout)
+            except Exception as e:
+                self.failures += 1
+                self.last_failure = time.time()
+                self.last_error = repr(e)
+
+                import logging
+
+                logging.getLogger(__name__).warning(
+                    "refreshing holiday data failed: %r", e
+                )
+                return None
+            self.successes += 1
+            self.last_success = time.time()
+            return True
+
+    def status(self):
+        """
+        :return: dict with the counters, times are seconds since the epoch or None,
+            it does not wait for a refresh which is running
+        """
+        return {
+            "running": self.is_running(),
+            "checks": self.checks,
+            "successes": self.successes,
+            "failures": self.failures,
+            "last_check": self.last_check,
+            "last_success": self.last_success,
+            "last_failure": self.last_failure,
+            "last_error": self.last_error,
+        }
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=REFRESH_INTERVAL, min_days_left=0, timeout=None):
+        """
+        start checking in a daemon thread, the first check runs immediately
+        :param interval: seconds between two checks
+        :param min_days_left: see refresh_once
+        :param timeout: see refresh_once
+        :return: the thread
+        """
+        if self.is_running():
+            raise RuntimeError("background refresher is already running")
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(interval, min_days_left, timeout),
+            name="cn_stock_holidays refresher %s" % (self.name or ""),
+            daemon=True,
+        )
+        self._thread.start()
+        return self._thread
+
+    def _run(self, interval, min_days_left, timeout):
+        while not self._stop.is_set():
+            self.refresh_once(min_days_left, timeout)
+            self._stop.wait(interval)
+
+    async def run_async(self, interval=REFRESH_INTERVAL, min_days_left=0, timeout=None):
+        """
+        check on a schedule in an asyncio task until stop() is called or the
+        task is cancelled, the checks run in a worker thread of the event loop
+        :param interval: seconds between two checks
+        :param min_days_left: see refresh_once
+        :param timeout: see refresh_once
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        self._stop.clear()
+        while not self._stop.is_set():
+            await loop.run_in_executor(None, self.refresh_once, min_days_left, timeout)
+            deadline = loop.time() + interval
+            while not self._stop.is_set() and loop.time() < deadline:
+                await asyncio.sleep(min(1, deadline - loop.time()))
+
+    def stop(self, timeout=None):
+        """
+        stop the thread or the asyncio task after the current check
+        :param timeout: seconds to wait for the thread to finish
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
@@ -0,0 +1,275 @@
+# coding: utf-8
+"""
+Fetch data files from github and keep them in the local cache
+
+Every cached file has a sidecar (e.g. data.txt.meta.json) with the ETag,
+Last-Modified and sha256 of the cached content. They are sent back as a
+conditional request, so a sync where nothing changed costs a 304 response
+and neither rewrites the cache file nor makes the data reload.
+
+Downloads of one cache file are single-flight between processes: they take
+a lock file (e.g. data.txt.lock), and a process which waited for the lock
+while another one refreshed the file reuses that result. Files are replaced
+atomically, so readers never see a half-written file.
+
+sync_markets refreshes the data files of several markets concurrently over
+one pooled requests session, sync_markets_async does the same in asyncio.
+The async functions run the blocking parts (the lock, requests and the file
+writes) in the default executor of the event loop, so it is never blocked.
+"""
+
+import functools
+import hashlib
+import importlib
+import json
+
+from cn_stock_holidays.common import atomic_write, file_lock, _file_stamp
+
+# requests is imported in the functions, it is only needed to sync data
+DATA_BASE_URL = (
+    "https://raw.githubusercontent.com/rainx/cn_stock_holidays/main/cn_stock_holidays/"
+)
+SIDECAR_SUFFIX = ".meta.json"
+LOCK_SUFFIX = ".lock"
+
+# connect and read timeout in seconds
+REQUEST_TIMEOUT = (5, 30)
+
+# market -> module with get_remote_and_cache/check_expired, add new data files here
+MARKETS = {
+    "cn": "cn_stock_holidays.data",
+    "hk": "cn_stock_holidays.data_hk",
+}
+
+
+def data_url(data_file_name, base_url=None):
+    """
+    :return: url of data_file_name, base_url defaults to DATA_BASE_URL
+    """
+    return (base_url or DATA_BASE_URL) + data_file_name
+
+
+def sidecar_path(cache_path):
+    return cache_path + SIDECAR_SUFFIX
+
+
+def lock_path(cache_path):
+    return cache_path + LOCK_SUFFIX
+
+
+def _file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def read_sidecar(cache_path):
+    """
+    :return: dict with url, etag, last_modified and sha256, it is empty if the
+        sidecar is missing or does not describe the current cache file
+    """
+    try:
+        with open(sidecar_path(cache_path), "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(meta, dict) or meta.get("sha256") != _file_digest(cache_path):
+        return {}
+    return meta
+
+
+def write_sidecar(cache_path, meta):
+    with atomic_write(sidecar_path(cache_path)) as f:
+        f.write(json.dumps(meta, indent=2, sort_keys=True).encode("utf-8"))
+
+
+def conditional_headers(meta):
+    """
+    :param meta: sidecar content
+    :return: request headers for a conditional GET
+    """
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def store_response(cache_path, url, meta, status_code, headers, content):
+    """
+    update the cache file and its sidecar from a response
+    :param meta: sidecar content sent with the request
+    :param status_code: int
+    :param headers: response headers, case insensitive mapping
+    :param content: response body, bytes
+    :return: True if the content of the cache file changed
+    """
+    if status_code == 304:
+        # rewritten to tell processes waiting for the lock that it is fresh
+        write_sidecar(cache_path, meta)
+        return False
+
+    digest = hashlib.sha256(content).hexdigest()
+    changed = digest != meta.get("sha256")
+    if changed:
+        with atomic_write(cache_path) as f:
+            f.write(content)
+
+    write_sidecar(
+        cache_path,
+        {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "sha256": digest,
+        },
+    )
+    return changed
+
+
+def new_session(pool_size=len(MARKETS)):
+    """
+    :param pool_size: number of connections kept open per host
+    :return: requests.Session, it can be shared by threads which sync data
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_to_cache(url, cache_path, session=None, timeout=REQUEST_TIMEOUT):
+    """
+    download url into cache_path with a conditional GET, unless another
+    process refreshed cache_path while this one waited for the lock
+    :param session: requests.Session, a new connection is used if None
+    :param timeout: requests timeout in seconds, a number or (connect, read)
+    :return: True if the content of the cache file changed
+    :raises requests.HTTPError: for error responses, the cache is left untouched
+    """
+    import requests
+
+    stamps = _file_stamp(cache_path), _file_stamp(sidecar_path(cache_path))
+    with file_lock(lock_path(cache_path)):
+        if (_file_stamp(cache_path), _file_stamp(sidecar_path(cache_path))) != stamps:
+            # another process refreshed the file while we waited for the lock
+            return _file_stamp(cache_path) != stamps[0]
+
+        meta = read_sidecar(cache_path)
+        if meta.get("url") != url:
+            meta = {"sha256": meta.get("sha256")} if meta else {}
+
+        response = (session or requests).get(
+            url, headers=conditional_headers(meta), timeout=timeout
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+        return store_response(
+            cache_path,
+            url,
+            meta,
+            response.status_code,
+            response.headers,
+            response.content,
+        )
+
+
+async def fetch_to_cache_async(url, cache_path, session=None, timeout=REQUEST_TIMEOUT):
+    """
+    fetch_to_cache in the default executor of the running event loop
+    :return: True if the content of the cache file changed
+    """
+    import asyncio
+
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(fetch_to_cache, url, cache_path, session, timeout)
+    )
+
+
+def _expired_markets(markets, force):
+    modules = {market: importlib.import_module(MARKETS[market]) for market in markets}
+    expired = [m for m in markets if force or modules[m].check_expired()]
+    return modules, expired
+
+
+def sync_markets(markets=None, force=False, timeout=REQUEST_TIMEOUT, session=None):
+    """
+    refresh the data files of markets concurrently, one thread per market
+    :param markets: names in MARKETS, all markets if None
+    :param force: also fetch markets whose data is not expired, which costs a
+        304 response when nothing changed
+    :param timeout: requests timeout in seconds, a number or (connect, read)
+    :param session: requests.Session shared by all downloads, by default a
+        new one which is closed afterwards
+    :return: dict of market -> True if it was fetched, False if not expired
+    :raises: the first error, after all downloads finished
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    markets = list(MARKETS) if markets is None else list(markets)
+    modules, expired = _expired_markets(markets, force)
+    result = {market: market in expired for market in markets}
+    if not expired:
+        return result
+
+    own_session = session is None
+    if own_session:
+        session = new_session(len(expired))
+    try:
+        with ThreadPoolExecutor(max_workers=len(expired)) as executor:
+            futures = [
+                executor.submit(
+                    modules[m].get_remote_and_cache, session=session, timeout=timeout
+                )
+                for m in expired
+            ]
+        for future in futures:
+            future.result()
+    finally:
+        if own_session:
+            session.close()
+    return result
+
+
+async def sync_markets_async(
+    markets=None, force=False, timeout=REQUEST_TIMEOUT, session=None
+):
+    """
+    sync_markets for asyncio, the markets are fetched concurrently with
+    asyncio.gather, see sync_markets for the parameters
+    :return: dict of market -> True if it was fetched, False if not expired
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    markets = list(MARKETS) if markets is None else list(markets)
+    # the first check_expired loads the data of the market
+    modules, expired = await loop.run_in_executor(
+        None, _expired_markets, markets, force
+    )
+    result = {market: market in expired for market in markets}
+    if not expired:
+        return result
+
+    own_session = session is None
+    if own_session:
+        session = new_session(len(expired))
+    try:
+        await asyncio.gather(
+            *[
+                modules[m].get_remote_and_cache_async(session=session, timeout=timeout)
+                for m in expired
+            ]
+        )
+    finally:
+        if own_session:
+            session.close()
+    return result
@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+Opt-in on-disk cache of the schedules of the zipline calendars
+
+Building a calendar runs date_range with the holidays over the whole window
+and converts the session times of every day to UTC. The resulting arrays
+(sessions, opens, closes, lunch break starts and ends) only depend on the
+holiday data, the session times and the window, so they are saved in a .npy
+file named after a hash of these three, and later calendars open it with mmap
+instead of computing the schedule again.
+
+The cache is disabled by default. It is enabled by setting the
+CN_STOCK_HOLIDAYS_SCHEDULE_CACHE environment variable to a directory, or by
+passing schedule_cache_dir to the calendar, and is only used by calendars
+built with lazy_minutes=True (see cn_stock_holidays.zipline.cached_schedule). A file is never changed once
+written, new holiday data gives a new key. Loading a file updates its mtime,
+and saving a new one deletes the files which were not loaded for
+MAX_AGE_DAYS, so the directory only keeps the schedules in use.
+
+This module requires numpy.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from cn_stock_holidays.common import atomic_write
+
+ENV_VAR = "CN_STOCK_HOLIDAYS_SCHEDULE_CACHE"
+VERSION = 1
+FILE_PATTERN = "schedule-*.npy*"
+
+# schedule files which were not loaded for this many days are deleted
+MAX_AGE_DAYS = 30
+
+# rows of the cached table, all datetime64[ns] in UTC
+SCHEDULE_FIELDS = (
+    "sessions",
+    "market_open",
+    "market_close",
+    "lunch_break_start",
+    "lunch_break_end",
+)
+
+
+def schedule_cache_dir(cache_dir=None):
+    """
+    :param cache_dir: directory given by the caller, it takes precedence over
+        the environment variable
+    :return: the cache directory, None if the cache is disabled
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get(ENV_VAR) or None
+    return cache_dir
+
+
+def schedule_key(holidays, session_times, start, end):
+    """
+    :param holidays: int64 nanoseconds of the holidays, e.g. DatetimeIndex.asi8
+    :param session_times: tuple of the values the sessions depend on, e.g. the
+        time zone, the open, close and lunch break times
+    :param start, end: window of the calendar, int nanoseconds since the epoch
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        ("%d %r %d %d" % (VERSION, tuple(session_times), start, end)).encode("utf-8")
+    )
+    digest.update(np.ascontiguousarray(holidays, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def schedule_path(cache_dir, key):
+    return os.path.join(cache_dir, "schedule-%s.npy" % key)
+
+
+def save_schedule(path, schedule):
+    """
+    :param schedule: dict of the SCHEDULE_FIELDS to datetime64[ns] arrays of the
+        same length
+    """
+    table = np.stack(
+        [
+            np.asarray(schedule[name], dtype="datetime64[ns]").view(np.int64)
+            for name in SCHEDULE_FIELDS
+        ]
+    )
+    cache_dir = os.path.dirname(path) or "."
+    os.makedirs(cache_dir, exist_ok=True)
+    with atomic_write(path) as f:
+        np.save(f, table)
+    prune_schedules(cache_dir)
+
+
+def prune_schedules(cache_dir, max_age=MAX_AGE_DAYS * 86400):
+    """
+    delete the schedule files of cache_dir which were not loaded or saved for
+    max_age seconds, processes which mapped them keep their data
+    :return: number of deleted files
+    """
+    import glob
+    import time
+
+    deadline = time.time() - max_age
+    deleted = 0
+    for path in glob.glob(os.path.join(cache_dir, FILE_PATTERN)):
+        try:
+            if os.stat(path).st_mtime < deadline:
+                os.remove(path)
+                deleted += 1
+        except OSError:
+            # removed by another process, or mapped on Windows
+            pass
+    return deleted
+
+
+def load_schedule(path):
+    """
+    :return: dict of the SCHEDULE_FIELDS to read-only datetime64[ns] arrays
+        backed by the mmapped file, None if the file does not exist or is not
+        a schedule
+    """
+    try:
+        table = np.load(path, mmap_mode="r")
+    except (OSError, ValueError, EOFError):
+        return None
+    try:
+        # the mtime tells prune_schedules that the file is in use
+        os.utime(path)
+    except OSError:
+        pass
+    if (
+        table.dtype != np.int64
+        or table.ndim != 2
+        or table.shape[0] != len(SCHEDULE_FIELDS)
+    ):
+        return None
+    return {
+        name: table[i].view("datetime64[ns]") for i, name in enumerate(SCHEDULE_FIELDS)
+    }
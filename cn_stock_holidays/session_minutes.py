@@ -0,0 +1,148 @@
+# coding: utf-8
+"""
+Trading minutes of sessions with a lunch break, for the zipline calendars
+
+Each session has two segments of minutes, [open, lunch break start] and
+[lunch break end, close], both ends included. The minutes of all sessions are
+computed with array operations only, there is no loop over the sessions, so
+this module requires numpy.
+"""
+
+import numpy as np
+
+NANOS_IN_MINUTE = 60 * 10**9
+
+
+def _as_nanos(values):
+    return np.asarray(values).astype("datetime64[ns]").view(np.int64)
+
+
+def segment_sizes(opens, lunch_break_starts, lunch_break_ends, closes):
+    """
+    :param opens, lunch_break_starts, lunch_break_ends, closes: datetime64 arrays
+        (or DatetimeIndex) with one value per session
+    :return: (before_lunch, after_lunch) int64 arrays, number of minutes of the
+        two segments of each session
+    """
+    opens = _as_nanos(opens)
+    closes = _as_nanos(closes)
+    before_lunch = (_as_nanos(lunch_break_starts) - opens) // NANOS_IN_MINUTE + 1
+    after_lunch = (closes - _as_nanos(lunch_break_ends)) // NANOS_IN_MINUTE + 1
+    return before_lunch, after_lunch
+
+
+def two_segment_minutes(opens, lunch_break_starts, lunch_break_ends, closes):
+    """
+    all trading minutes of the sessions, in session order
+    :param opens, lunch_break_starts, lunch_break_ends, closes: datetime64 arrays
+        (or DatetimeIndex) with one value per session
+    :return: datetime64[ns] array
+    """
+    before_lunch, after_lunch = segment_sizes(
+        opens, lunch_break_starts, lunch_break_ends, closes
+    )
+
+    # the segments of all sessions in order: open of day 0, lunch end of day 0,
+    # open of day 1, ...
+    n = len(before_lunch)
+    starts = np.empty(2 * n, dtype=np.int64)
+    starts[0::2] = _as_nanos(opens)
+    starts[1::2] = _as_nanos(lunch_break_ends)
+    sizes = np.empty(2 * n, dtype=np.int64)
+    sizes[0::2] = before_lunch
+    sizes[1::2] = after_lunch
+
+    # minute i of the result belongs to segment k, which starts at position
+    # offsets[k], so its value is starts[k] + (i - offsets[k]) * NANOS_IN_MINUTE
+    offsets = np.cumsum(sizes)
+    total = int(offsets[-1]) if n else 0
+    offsets -= sizes
+    minutes = np.arange(0, total * NANOS_IN_MINUTE, NANOS_IN_MINUTE, dtype=np.int64)
+    minutes += np.repeat(starts - offsets * NANOS_IN_MINUTE, sizes)
+    return minutes.view("datetime64[ns]")
+
+
+class MinuteWindows(object):
+    """
+    minutes of windows of consecutive sessions, computed on demand
+
+    Only the requested windows are materialized instead of all the minutes of
+    the calendar, the maxsize most recently used windows are cached. The
+    returned arrays are shared by the callers and read-only.
+    """
+
+    def __init__(self, opens, lunch_break_starts, lunch_break_ends, closes, maxsize=8):
+        """
+        :param opens, lunch_break_starts, lunch_break_ends, closes: datetime64
+            arrays (or DatetimeIndex) with one value per session, in order
+        :param maxsize: number of windows kept in the cache
+        """
+        import threading
+        from collections import OrderedDict
+
+        self.opens = _as_nanos(opens)
+        self.lunch_break_starts = _as_nanos(lunch_break_starts)
+        self.lunch_break_ends = _as_nanos(lunch_break_ends)
+        self.closes = _as_nanos(closes)
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.opens)
+
+    def for_sessions(self, first, last):
+        """
+        :param first, last: positions of the first and the last session, inclusive
+        :return: datetime64[ns] array of the minutes of the sessions
+        """
+        first = max(int(first), 0)
+        last = min(int(last), len(self.opens) - 1)
+        key = (first, last)
+        with self._lock:
+            minutes = self._cache.get(key)
+            if minutes is not None:
+                self._cache.move_to_end(key)
+                return minutes
+
+        window = slice(first, max(first, last + 1))
+        minutes = two_segment_minutes(
+            self.opens[window],
+            self.lunch_break_starts[window],
+            self.lunch_break_ends[window],
+            self.closes[window],
+        )
+        minutes.flags.writeable = False
+
+        with self._lock:
+            self._cache[key] = minutes
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return minutes
+
+    def in_range(self, start, end):
+        """
+        :param start, end: datetime64 (or int nanoseconds since the epoch),
+            both included
+        :return: datetime64[ns] array of the trading minutes in [start, end]
+        """
+        start = _as_nanos(start).item()
+        end = _as_nanos(end).item()
+        # sessions which close after start and open before end
+        first = int(np.searchsorted(self.closes, start, side="left"))
+        last = int(np.searchsorted(self.opens, end, side="right")) - 1
+        if first > last:
+            return np.empty(0, dtype="datetime64[ns]")
+
+        minutes = self.for_sessions(first, last)
+        nanos = minutes.view(np.int64)
+        return minutes[
+            np.searchsorted(nanos, start, side="left") : np.searchsorted(
+                nanos, end, side="right"
+            )
+        ]
+
+    def cache_clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,96 @@
+# coding: utf-8
+"""
+Immutable snapshots of the holiday data of one market
+
+A snapshot holds the holiday sets loaded from one data file together with the
+TradingDayIndex built from them. It is never changed after it is built: a
+refresh builds a new snapshot and replaces the reference held by
+meta_functions.meta_get_snapshot, so threads which are reading the old one
+keep using it without locks and without parsing the file again.
+"""
+
+from cn_stock_holidays.calendar_file import load_calendar_file
+from cn_stock_holidays.trading_index import TradingDayIndex
+
+
+class CalendarSnapshot(object):
+    """
+    holiday data of one market as loaded at one time
+
+    holidays, half_days and days_off are shared by all readers of the snapshot
+    and must not be modified.
+    """
+
+    __slots__ = (
+        "holidays",
+        "half_days",
+        "_days_off",
+        "with_half_day",
+        "index",
+        "path",
+        "stamp",
+    )
+
+    def __init__(self, holidays, half_days, index, path=None, stamp=None):
+        """
+        :param holidays: set of datetime.date which are not trading days
+        :param half_days: set of datetime.date which are half-day trading days
+        :param index: TradingDayIndex of the market
+        :param path: the data file the snapshot was loaded from
+        :param stamp: common._file_stamp of the cache file when it was loaded
+        """
+        set_ = object.__setattr__
+        set_(self, "holidays", holidays)
+        set_(self, "half_days", half_days)
+        set_(self, "_days_off", None)
+        set_(self, "with_half_day", (holidays, half_days))
+        set_(self, "index", index)
+        set_(self, "path", path)
+        set_(self, "stamp", stamp)
+
+    @property
+    def days_off(self):
+        """
+        holidays and half-day trading days, which count as holidays for get_cached
+        for backward compatibility. The union is only built on first use, and
+        it is holidays itself when there are no half-day trading days.
+        """
+        days_off = self._days_off
+        if days_off is None:
+            days_off = (
+                self.holidays | self.half_days if self.half_days else self.holidays
+            )
+            # readers racing here build equal sets, either one is kept
+            object.__setattr__(self, "_days_off", days_off)
+        return days_off
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CalendarSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CalendarSnapshot is immutable")
+
+    @classmethod
+    def from_file(
+        cls, filename, stamp=None, half_days_are_holidays=False, write_binary=False
+    ):
+        """
+        :param filename: path of the text data file
+        :param stamp: common._file_stamp of the cache file
+        :param half_days_are_holidays: build the index with half-day trading days
+            as holidays, like the SHSZ functions always did
+        :param write_binary: rebuild the binary file of filename when it is
+            stale, see calendar_file.load_calendar_file
+        :return: CalendarSnapshot
+        """
+        holidays, half_days, index = load_calendar_file(filename, write_binary)
+        if half_days_are_holidays and half_days:
+            index = TradingDayIndex(holidays | half_days)
+        return cls(holidays, half_days, index, filename, stamp)
+
+    def __repr__(self):
+        return "<CalendarSnapshot %s, %d holidays, %d half days>" % (
+            self.path,
+            len(self.holidays),
+            len(self.half_days),
+        )
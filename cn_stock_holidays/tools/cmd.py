@@ -1,8 +1,7 @@
 # coding: utf-8
 
 import click
-from cn_stock_holidays import data
-from cn_stock_holidays import data_hk
+from cn_stock_holidays.common import int_to_date
 import datetime
 import platform
 
@@ -21,10 +20,11 @@ import platform
 )
 @click.option("--daytype", "-d", default="workday", help="workday or holiday")
 def main(market, start, end, output, format, daytype):
+    # only load the data of the requested market
     if market == "cn":
-        holiday = data
+        from cn_stock_holidays import data as holiday
     else:
-        holiday = data_hk
+        from cn_stock_holidays import data_hk as holiday
 
     start_date = parse_date(start)
     end_date = parse_date(end)
@@ -62,7 +62,7 @@ def parse_date(dstr):
 
     # handle YYYYMMDD
     if len(dstr) == 8:
-        return data.int_to_date(dstr)
+        return int_to_date(dstr)
     else:
         # handle YYYY-MM-DD
         darr = dstr.split("-")
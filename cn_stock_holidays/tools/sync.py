@@ -0,0 +1,41 @@
+# coding: utf-8
+
+import click
+
+from cn_stock_holidays.remote import MARKETS, REQUEST_TIMEOUT, sync_markets
+
+
+@click.command()
+@click.option(
+    "--market",
+    "-m",
+    multiple=True,
+    type=click.Choice(sorted(MARKETS)),
+    help="Market to sync, can be repeated, default is all markets",
+)
+@click.option(
+    "--timeout",
+    "-t",
+    type=float,
+    default=None,
+    help="Timeout in seconds, default is %s connect and %s read" % REQUEST_TIMEOUT,
+)
+@click.option(
+    "--force", "-f", is_flag=True, help="Fetch data even if it is not expired"
+)
+def main(market, timeout, force):
+    """Sync the holiday data of all markets concurrently"""
+    result = sync_markets(
+        markets=market or None,
+        force=force,
+        timeout=REQUEST_TIMEOUT if timeout is None else timeout,
+    )
+    for name, fetched in result.items():
+        if fetched:
+            click.echo("%s: fetched" % name)
+        else:
+            click.echo("%s: local data is not expired, do not fetch new data" % name)
+
+
+if __name__ == "__main__":
+    main()
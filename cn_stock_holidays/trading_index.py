@@ -0,0 +1,503 @@
+# coding: utf-8
+"""
+Precomputed trading day index built from a holiday set
+
+The index covers every calendar day from January 1st of the first year in the
+holiday data to December 31st of the last one. It keeps one byte per calendar
+day plus the sorted trading days and the number of trading days before each
+day, so that lookups become single index operations instead of a day by day
+walk, using only the stdlib ``array`` and ``bytearray`` types.
+
+numpy is not a dependency of this package, array inputs (numpy arrays, pandas
+DatetimeIndex / Series) are only handled with numpy when the caller passes them.
+"""
+
+import datetime
+import itertools
+from array import array
+
+# numpy datetime64[D] values count days from 1970-01-01
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def _numpy_for(values):
+    """
+    :return: numpy module if values is a numpy/pandas array like object, otherwise None
+    """
+    if hasattr(values, "__array__"):
+        import numpy
+
+        return numpy
+    return None
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required for array inputs, try pip install numpy")
+    return numpy
+
+
+def _to_day_array(np, values):
+    """
+    convert datetime64 arrays, DatetimeIndex or Series to a datetime64[D] array,
+    timezone aware values are converted by their wall time
+    """
+    accessor = getattr(values, "dt", values)
+    if getattr(accessor, "tz", None) is not None:
+        values = accessor.tz_localize(None)
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+def _weekdays_before(o):
+    """
+    :param o: date ordinal
+    :return: number of weekdays in ordinals [1, o)
+    """
+    n = o - 1
+    return n // 7 * 5 + min(n % 7, 5)
+
+
+def _roll_weekday(days, step):
+    """
+    :param days: days since 1970-01-01
+    :param step: 1 to roll forward, -1 to roll backward
+    :return: days of the first weekday on or after (before) the given day
+    """
+    while (days + 3) % 7 >= 5:
+        days += step
+    return days
+
+
+# flags of the compact day calendar, one byte per calendar day
+TRADING_DAY = 1
+HALF_DAY = 2
+
+# flags from Monday to Sunday
+WEEK_PATTERN = bytes([TRADING_DAY] * 5 + [0] * 2)
+# maps day flags to 1 for trading days and 0 otherwise
+_IS_TRADING_DAY = bytes([0] + [1] * 255)
+
+
+class TradingDayIndex(object):
+    """
+    Compact calendar and sorted index of trading days for one market
+
+    Dates are stored as proleptic Gregorian ordinals (``datetime.date.toordinal``)
+    so that lookups only compare integers. ``days`` keeps one byte of flags per
+    calendar day, so checking a date is a single index operation.
+    """
+
+    def __init__(self, holidays, half_days=()):
+        """
+        :param holidays: iterable of datetime.date which are not trading days
+        :param half_days: iterable of datetime.date which are half-day trading days
+        """
+        holidays = set(holidays)
+        half_days = set(half_days)
+        known = holidays | half_days
+        if known:
+            horizon = max(known)
+            first = datetime.date(min(known).year, 1, 1).toordinal()
+            last = datetime.date(horizon.year, 12, 31).toordinal()
+            horizon = horizon.toordinal()
+        else:
+            horizon = None
+            first, last = 1, 0
+
+        # ordinal 1 (0001-01-01) is a Monday, so weekday == (ordinal - 1) % 7,
+        # the tables are built with C level iterators instead of a loop per day
+        n_days = last - first + 1
+        offset = (first - 1) % 7
+        week = WEEK_PATTERN[offset:] + WEEK_PATTERN[:offset]
+        days = bytearray((week * (n_days // 7 + 1))[:n_days])
+        for d in holidays:
+            days[d.toordinal() - first] = 0
+        for d in half_days:
+            k = d.toordinal() - first
+            if days[k]:
+                days[k] = TRADING_DAY | HALF_DAY
+
+        sessions = array("i", itertools.compress(range(first, last + 1), days))
+        # positions[k] is the number of sessions before calendar day first + k,
+        # i.e. the position in self.sessions of the first session on or after it
+        positions = array("i", [0])
+        positions.extend(itertools.accumulate(days.translate(_IS_TRADING_DAY)))
+
+        self._set_tables(first, days, sessions, positions, horizon)
+
+    @classmethod
+    def from_buffers(cls, first, days, sessions, positions, horizon=None):
+        """
+        create an index from tables built before, e.g. memoryviews of a mapped file
+        :param first: ordinal of the first calendar day
+        :param days: one byte of flags per calendar day
+        :param sessions: int32 ordinals of trading days
+        :param positions: int32 session positions, one more than the number of days
+        :param horizon: ordinal of the last holiday or half-day
+        """
+        index = cls.__new__(cls)
+        index._set_tables(first, days, sessions, positions, horizon)
+        return index
+
+    def _set_tables(self, first, days, sessions, positions, horizon):
+        self.first = first
+        self.last = first + len(days) - 1
+        # the last date known by the holiday data, None if there is no data
+        self.horizon = horizon
+        self.days = days
+        self.sessions = sessions
+        self.positions = positions
+        self._numpy_tables = None
+        self._numpy_session_days = None
+
+    @property
+    def nbytes(self):
+        """
+        :return: memory used by the calendar tables in bytes
+        """
+        return (
+            len(self.days)
+            + self.sessions.itemsize * len(self.sessions)
+            + self.positions.itemsize * len(self.positions)
+        )
+
+    def is_trading_day(self, dt):
+        """
+        :param dt: datetime.date
+        :return: True if dt is a trading day, weekdays outside of the holiday data
+            range are trading days
+        """
+        o = dt.toordinal()
+        k = o - self.first
+        if 0 <= k < len(self.days):
+            return self.days[k] != 0
+        return (o - 1) % 7 < 5
+
+    def is_half_day_trading_day(self, dt):
+        """
+        :param dt: datetime.date
+        :return: True if dt is a half-day trading day
+        """
+        k = dt.toordinal() - self.first
+        if 0 <= k < len(self.days):
+            return self.days[k] & HALF_DAY != 0
+        return False
+
+    def _range_str(self):
+        return (
+            f"{datetime.date.fromordinal(self.first)} - "
+            f"{datetime.date.fromordinal(self.last)}"
+        )
+
+    def _horizon_str(self):
+        limit = self.last if self.horizon is None else self.horizon
+        return (
+            f"{datetime.date.fromordinal(self.first)} - "
+            f"{datetime.date.fromordinal(limit)}"
+        )
+
+    def numpy_tables(self, np):
+        """
+        :return: (positions, sessions, days) as numpy arrays sharing memory with the index
+        """
+        if self._numpy_tables is None:
+            self._numpy_tables = tuple(
+                np.frombuffer(table, dtype=memoryview(table).format)
+                for table in (self.positions, self.sessions, self.days)
+            )
+        return self._numpy_tables
+
+    def numpy_session_days(self, np):
+        """
+        :return: read-only datetime64[D] numpy array of all sessions in the index
+        """
+        if self._numpy_session_days is None:
+            _positions, sessions, _days = self.numpy_tables(np)
+            session_days = (sessions - EPOCH_ORDINAL).astype("datetime64[D]")
+            session_days.flags.writeable = False
+            self._numpy_session_days = session_days
+        return self._numpy_session_days
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def covers(self, dt):
+        """
+        :param dt: datetime.date
+        :return: True if dt is inside the range described by the holiday data
+        """
+        return self.first <= dt.toordinal() <= self.last
+
+    def next_trading_day(self, dt):
+        """
+        :param dt: datetime.date
+        :return: the first trading day after dt, or None if it is beyond the index
+        """
+        sessions = self.sessions
+        # positions[k] is the first session on or after calendar day first + k
+        k = dt.toordinal() - self.first + 1
+        if not 0 < k <= len(self.days):
+            return None
+        i = self.positions[k]
+        if i >= len(sessions):
+            return None
+        return datetime.date.fromordinal(sessions[i])
+
+    def previous_trading_day(self, dt):
+        """
+        :param dt: datetime.date
+        :return: the last trading day before dt, or None if it is beyond the index
+        """
+        k = dt.toordinal() - self.first
+        if not 0 <= k <= len(self.days):
+            return None
+        i = self.positions[k] - 1
+        if i < 0:
+            return None
+        return datetime.date.fromordinal(self.sessions[i])
+
+    def shift_trading_days(self, dt, n):
+        """
+        :param dt: datetime.date between the first day of the data and the horizon
+        :param n: number of trading days to move, negative to move backwards
+        :return: the n-th trading day after dt (n > 0), before dt (n < 0), or dt itself (n == 0)
+        :raises ValueError: if dt or the result is before the first day of the data or
+            after the horizon, the last listed holiday: later days are not known yet
+        """
+        limit = self.last if self.horizon is None else self.horizon
+        if not self.first <= dt.toordinal() <= limit:
+            raise ValueError(
+                f"{dt} is outside of the holiday data range {self._horizon_str()}"
+            )
+        if n == 0:
+            return dt
+
+        k = dt.toordinal() - self.first
+        if n > 0:
+            i = self.positions[k + 1] + n - 1
+        else:
+            i = self.positions[k] + n
+
+        if i < 0 or i >= len(self.sessions) or self.sessions[i] > limit:
+            raise ValueError(
+                f"shifting {dt} by {n} trading days runs past the holiday data "
+                f"range {self._horizon_str()}, try to sync data"
+            )
+        return datetime.date.fromordinal(self.sessions[i])
+
+    def count_trading_days(self, start, end):
+        """
+        :param start: datetime.date
+        :param end: datetime.date
+        :return: number of trading days in [start, end], weekdays outside of the
+            holiday data range are counted as trading days like trading_days_between does
+        """
+        a = start.toordinal()
+        b = end.toordinal()
+        if a > b:
+            return 0
+
+        count = 0
+        if a < self.first:
+            count += _weekdays_before(min(b + 1, self.first)) - _weekdays_before(a)
+        if b > self.last:
+            count += _weekdays_before(b + 1) - _weekdays_before(max(a, self.last + 1))
+
+        lo = max(a, self.first)
+        hi = min(b, self.last)
+        if lo <= hi:
+            count += (
+                self.positions[hi - self.first + 1] - self.positions[lo - self.first]
+            )
+        return count
+
+    def session_index(self, dt):
+        """
+        :param dt: datetime.date, a list of them, or a datetime64 array / DatetimeIndex / Series
+        :return: 0-based session number of dt, a list or an int numpy array for array inputs
+        :raises ValueError: if any date is not a trading day inside the holiday data range
+        """
+        np = _numpy_for(dt)
+        if np is not None:
+            return self._session_index_array(np, _to_day_array(np, dt))
+        if isinstance(dt, (list, tuple)):
+            return [self.session_index(d) for d in dt]
+
+        o = dt.toordinal()
+        if self.first <= o <= self.last:
+            i = self.positions[o - self.first]
+            if i < len(self.sessions) and self.sessions[i] == o:
+                return i
+        raise ValueError(
+            f"{dt} is not a trading day in the holiday data range {self._range_str()}"
+        )
+
+    def _session_index_array(self, np, days):
+        positions, sessions, _days = self.numpy_tables(np)
+        k = days.astype(np.int64) + (EPOCH_ORDINAL - self.first)
+        valid = (k >= 0) & (k <= self.last - self.first)
+        result = positions[np.where(valid, k, 0)]
+        if len(sessions):
+            matched = sessions[np.minimum(result, len(sessions) - 1)]
+            valid &= matched == k + self.first
+        else:
+            valid[...] = False
+        if not valid.all():
+            raise ValueError(
+                f"{days[~valid][0]} is not a trading day in the holiday data range "
+                f"{self._range_str()}"
+            )
+        return result
+
+    def session_at(self, i):
+        """
+        :param i: 0-based session number, a list of them, or an int numpy array
+        :return: datetime.date, a list of them, or a datetime64[D] numpy array for array inputs
+        :raises IndexError: if any session number is out of range
+        """
+        np = _numpy_for(i)
+        if np is not None:
+            _positions, sessions, _days = self.numpy_tables(np)
+            i = np.asarray(i, dtype=np.int64)
+            if ((i < 0) | (i >= len(sessions))).any():
+                raise IndexError(f"session number out of range [0, {len(sessions)})")
+            return (sessions[i] - EPOCH_ORDINAL).astype("datetime64[D]")
+        if isinstance(i, (list, tuple)):
+            return [self.session_at(n) for n in i]
+
+        if not 0 <= i < len(self.sessions):
+            raise IndexError(
+                f"session number {i} out of range [0, {len(self.sessions)})"
+            )
+        return datetime.date.fromordinal(self.sessions[i])
+
+    def is_trading_day_array(self, values):
+        """
+        :param values: datetime64 array, DatetimeIndex, Series or a list of datetime.date
+        :return: bool numpy array, weekdays outside of the holiday data range are
+            trading days like is_trading_day does, NaT is not a trading day
+        """
+        np = _numpy_for(values) or _require_numpy()
+        raw = _to_day_array(np, values)
+        days = raw.astype(np.int64)
+        _positions, _sessions, flags = self.numpy_tables(np)
+
+        k = days + (EPOCH_ORDINAL - self.first)
+        inside = (k >= 0) & (k < len(flags))
+        # 1970-01-01 is a Thursday
+        mask = (days + 3) % 7 < 5
+        mask[inside] = flags[k[inside]] != 0
+        mask[np.isnat(raw)] = False
+        return mask
+
+    def roll_array(self, values, direction="forward"):
+        """
+        snap every date to a trading day, dates which are trading days are kept
+        :param values: datetime64 array, DatetimeIndex, Series or a list of datetime.date
+        :param direction: "forward" (next trading day), "backward" (previous trading day)
+            or "nearest" (the closer one, forward on a tie)
+        :return: datetime64[D] numpy array with the same length as values, NaT is kept
+        """
+        if direction not in ("forward", "backward", "nearest"):
+            raise ValueError(
+                f"direction must be forward, backward or nearest, got {direction!r}"
+            )
+        np = _numpy_for(values) or _require_numpy()
+        raw = _to_day_array(np, values)
+
+        if direction == "nearest":
+            forward = self.roll_array(raw, "forward")
+            backward = self.roll_array(raw, "backward")
+            use_backward = (raw - backward) < (forward - raw)
+            return np.where(use_backward, backward, forward)
+
+        nat = np.isnat(raw)
+        days = np.where(nat, 0, raw.astype(np.int64))
+        positions, sessions, _days = self.numpy_tables(np)
+        first = self.first - EPOCH_ORDINAL
+        last = self.last - EPOCH_ORDINAL
+
+        # 1970-01-01 is a Thursday, weekends are skipped first, days outside
+        # of the data range are trading days when they are weekdays
+        weekday = (days + 3) % 7
+        if direction == "forward":
+            result = days + np.where(weekday >= 5, 7 - weekday, 0)
+        else:
+            result = days - np.where(weekday >= 5, weekday - 4, 0)
+        # a weekend next to the data range can be shifted into it
+        inside = (result >= first) & (result <= last)
+        k = np.where(inside, result - first, 0)
+        if direction == "forward":
+            i = positions[k]
+            found = inside & (i < len(sessions))
+            # no session left in the data range, the next weekday after it is used
+            result[inside & ~found] = _roll_weekday(last + 1, 1)
+        else:
+            i = positions[k + 1] - 1
+            found = inside & (i >= 0)
+            result[inside & ~found] = _roll_weekday(first - 1, -1)
+        result[found] = sessions[i[found]] - EPOCH_ORDINAL
+
+        result = result.astype("datetime64[D]")
+        result[nat] = np.datetime64("NaT")
+        return result
+
+    def _trading_day_ordinals(self, start, end):
+        """
+        :return: (before, sessions, after) ordinal ranges making up [start, end],
+            before/after are the parts outside of the holiday data range
+        """
+        a = max(start.toordinal(), self.first)
+        b = min(end.toordinal(), self.last)
+        lo = hi = 0
+        if a <= b:
+            lo = self.positions[a - self.first]
+            hi = self.positions[b - self.first + 1]
+
+        before = range(start.toordinal(), min(end.toordinal() + 1, self.first))
+        after = range(max(start.toordinal(), self.last + 1), end.toordinal() + 1)
+        return before, (lo, hi), after
+
+    def iter_trading_days(self, start, end):
+        """
+        :param start: datetime.date
+        :param end: datetime.date
+        :return: a generator of datetime.date for trading days in [start, end]
+        """
+        before, (lo, hi), after = self._trading_day_ordinals(start, end)
+        # weekdays outside of the holiday data range are trading days
+        for o in itertools.chain(before, self.sessions[lo:hi], after):
+            if (o - 1) % 7 < 5:
+                yield datetime.date.fromordinal(o)
+
+    def trading_days_between_array(self, start, end):
+        """
+        :param start: datetime.date
+        :param end: datetime.date
+        :return: trading days in [start, end] like trading_days_between, as a read-only
+            datetime64[D] numpy array, it is a view without copy when the range is inside
+            the holiday data range. Without numpy a list of datetime.date is returned
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            return list(self.iter_trading_days(start, end))
+
+        before, (lo, hi), after = self._trading_day_ordinals(start, end)
+        session_days = self.numpy_session_days(np)[lo:hi]
+        if not before and not after:
+            return session_days
+
+        def weekdays(ordinals):
+            days = np.arange(
+                ordinals.start - EPOCH_ORDINAL,
+                ordinals.stop - EPOCH_ORDINAL,
+                dtype=np.int64,
+            )
+            return days[(days + 3) % 7 < 5].astype("datetime64[D]")
+
+        result = np.concatenate([weekdays(before), session_days, weekdays(after)])
+        result.flags.writeable = False
+        return result
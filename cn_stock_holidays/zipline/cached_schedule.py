@@ -0,0 +1,202 @@
+"""
+Construction of the zipline calendars from schedule arrays
+
+TradingCalendar.__init__ of zipline 1.x computes the schedule and then the
+minutes of the whole window (_trading_minutes_nanos). With lazy_minutes=True
+the calendars of this package set the same attributes with init_calendar
+instead, from arrays which are computed by compute_schedule or loaded from the
+on-disk schedule cache (see cn_stock_holidays.schedule_cache), and the minutes
+are only built when a zipline API which needs all of them is called.
+
+init_calendar follows the private attributes of the zipline TradingCalendar,
+so it is opt-in and only used with that class, see zipline_init_supported.
+The calendars are built with TradingCalendar.__init__ by default.
+"""
+
+import warnings
+
+from pandas import DatetimeIndex, Timestamp, date_range
+import numpy as np
+
+from cn_stock_holidays.schedule_cache import (
+    load_schedule,
+    save_schedule,
+    schedule_cache_dir,
+    schedule_key,
+    schedule_path,
+)
+
+
+def zipline_init_supported():
+    """
+    :return: True if TradingCalendar is the class of zipline 1.0 - 1.3 whose
+        constructor init_calendar replaces, False for other versions and
+        implementations (e.g. trading_calendars), which are constructed with
+        their own __init__
+    """
+    import zipline
+    from zipline.utils.calendars import TradingCalendar
+
+    major = str(getattr(zipline, "__version__", "")).split(".")[0]
+    return (
+        major == "1"
+        and TradingCalendar.__module__ == "zipline.utils.calendars.trading_calendar"
+    )
+
+
+def compute_schedule(calendar, lunch_break_start, lunch_break_end, start, end):
+    """
+    the schedule computed like TradingCalendar.__init__, with the lunch breaks
+    :return: dict of the schedule_cache.SCHEDULE_FIELDS to datetime64[ns] UTC arrays
+    """
+    from zipline.utils.calendars.trading_calendar import (
+        _overwrite_special_dates,
+        days_at_time,
+    )
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        _all_days = date_range(start, end, freq=calendar.day, tz="UTC")
+
+    # open_offset, close_offset and weekmask are not defined by every
+    # TradingCalendar, missing ones mean the defaults of zipline 1.x
+    opens = days_at_time(
+        _all_days, calendar.open_time, calendar.tz, getattr(calendar, "open_offset", 0)
+    )
+    closes = days_at_time(
+        _all_days,
+        calendar.close_time,
+        calendar.tz,
+        getattr(calendar, "close_offset", 0),
+    )
+    _overwrite_special_dates(
+        _all_days, opens, calendar._calculate_special_opens(start, end)
+    )
+    _overwrite_special_dates(
+        _all_days, closes, calendar._calculate_special_closes(start, end)
+    )
+    lunch_break_starts = days_at_time(_all_days, lunch_break_start, calendar.tz, 0)
+    lunch_break_ends = days_at_time(_all_days, lunch_break_end, calendar.tz, 0)
+    return {
+        "sessions": _all_days.values,
+        "market_open": opens.values,
+        "market_close": closes.values,
+        "lunch_break_start": lunch_break_starts.values,
+        "lunch_break_end": lunch_break_ends.values,
+    }
+
+
+def calendar_schedule_path(
+    calendar, holidays, lunch_break_start, lunch_break_end, start, end, cache_dir=None
+):
+    """
+    :param holidays: DatetimeIndex of the adhoc holidays of the calendar
+    :return: path of the cached schedule, None if the cache is disabled
+    """
+    cache_dir = schedule_cache_dir(cache_dir)
+    if cache_dir is None:
+        return None
+
+    session_times = (
+        calendar.name,
+        str(calendar.tz),
+        calendar.open_time,
+        calendar.close_time,
+        lunch_break_start,
+        lunch_break_end,
+        getattr(calendar, "open_offset", 0),
+        getattr(calendar, "close_offset", 0),
+        str(getattr(calendar, "weekmask", None)),
+    )
+    key = schedule_key(
+        holidays.asi8, session_times, Timestamp(start).value, Timestamp(end).value
+    )
+    return schedule_path(cache_dir, key)
+
+
+def cache_window_end(end):
+    """
+    the cached schedules run to the end of the year of end and are cut at end
+    when they are loaded, so calendars with the default end, which moves every
+    day, share one file per year
+    """
+    return Timestamp(end).normalize().replace(month=12, day=31)
+
+
+def calendar_schedule(
+    calendar, holidays, lunch_break_start, lunch_break_end, start, end, cache_dir=None
+):
+    """
+    the schedule of calendar, loaded from the schedule cache when it is enabled
+    and the schedule was saved before. Only used with lazy_minutes=True, the
+    arrays are passed to init_calendar
+    :return: dict of the schedule_cache.SCHEDULE_FIELDS to datetime64[ns] UTC arrays
+    """
+    window_end = cache_window_end(end)
+    path = calendar_schedule_path(
+        calendar,
+        holidays,
+        lunch_break_start,
+        lunch_break_end,
+        start,
+        window_end,
+        cache_dir=cache_dir,
+    )
+    if path is None:
+        return compute_schedule(
+            calendar, lunch_break_start, lunch_break_end, start, end
+        )
+
+    schedule = load_schedule(path)
+    if schedule is None:
+        schedule = compute_schedule(
+            calendar, lunch_break_start, lunch_break_end, start, window_end
+        )
+        save_schedule(path, schedule)
+
+    n = np.searchsorted(
+        schedule["sessions"].view(np.int64), Timestamp(end).value, side="right"
+    )
+    return {name: values[:n] for name, values in schedule.items()}
+
+
+def init_calendar(calendar, schedule, start, end):
+    """
+    set what TradingCalendar.__init__ of zipline 1.x sets, from the schedule
+    arrays, except _trading_minutes_nanos which the calendars build on first use
+    """
+    from lru import LRU
+    import pandas as pd
+
+    _all_days = DatetimeIndex(schedule["sessions"]).tz_localize("UTC")
+    calendar._opens = DatetimeIndex(schedule["market_open"]).tz_localize("UTC")
+    calendar._closes = DatetimeIndex(schedule["market_close"]).tz_localize("UTC")
+    calendar._lunch_break_starts = DatetimeIndex(
+        schedule["lunch_break_start"]
+    ).tz_localize("UTC")
+    calendar._lunch_break_ends = DatetimeIndex(schedule["lunch_break_end"]).tz_localize(
+        "UTC"
+    )
+
+    # the opens and closes of the schedule already include the special ones
+    calendar.schedule = pd.DataFrame(
+        index=_all_days,
+        columns=["market_open", "market_close"],
+        data={
+            "market_open": calendar._opens,
+            "market_close": calendar._closes,
+        },
+        dtype="datetime64[ns]",
+    )
+    calendar._minute_to_session_label_cache = LRU(1)
+    calendar.market_opens_nanos = calendar.schedule.market_open.values.astype(np.int64)
+    calendar.market_closes_nanos = calendar.schedule.market_close.values.astype(
+        np.int64
+    )
+    calendar.first_trading_session = _all_days[0]
+    calendar.last_trading_session = _all_days[-1]
+
+    _special_closes = calendar._calculate_special_closes(start, end)
+    calendar._early_closes = pd.DatetimeIndex(
+        _special_closes.map(calendar.minute_to_session_label)
+    )
@@ -1,22 +1,55 @@
 from datetime import time
-from cn_stock_holidays.data_hk import get_cached
+from functools import cached_property
+from cn_stock_holidays.data_hk import get_holiday_index
 from pandas import Timestamp, date_range, DatetimeIndex
 import pytz
 from zipline.utils.memoize import remember_last, lazyval
 import warnings
 
 from zipline.utils.calendars import TradingCalendar
-from zipline.utils.calendars.trading_calendar import days_at_time, NANOS_IN_MINUTE
-import numpy as np
+from zipline.utils.calendars.trading_calendar import days_at_time
 import pandas as pd
 
+from cn_stock_holidays.session_minutes import MinuteWindows, two_segment_minutes
+from cn_stock_holidays.zipline.cached_schedule import (
+    calendar_schedule,
+    init_calendar,
+    zipline_init_supported,
+)
+
 # lunch break for shanghai and shenzhen exchange
 lunch_break_start = time(12, 30)
 lunch_break_end = time(14, 31)
 
 start_default = pd.Timestamp("2000-12-25", tz="UTC")
-end_base = pd.Timestamp("today", tz="UTC")
-end_default = end_base + pd.Timedelta(days=365)
+
+
+def default_end():
+    """
+    end of the calendar when none is given, one year after today. It is computed
+    for each new calendar so long running processes do not keep the date of the
+    import.
+    """
+    return pd.Timestamp("today", tz="UTC").normalize() + pd.Timedelta(days=365)
+
+
+def __getattr__(name):
+    # end_base and end_default were computed once at import, they are kept as
+    # deprecated aliases computed on access
+    if name in ("end_base", "end_default"):
+        warnings.warn(
+            f"{name} is deprecated, use default_end()",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        if name == "end_base":
+            return pd.Timestamp("today", tz="UTC")
+        return default_end()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# number of session windows whose minutes are kept by minutes_for_sessions
+minute_window_cache_size = 8
 
 
 class HKExchangeCalendar(TradingCalendar):
@@ -37,17 +70,62 @@ class HKExchangeCalendar(TradingCalendar):
     for the guy need to keep updating about holiday file, try to add `cn-stock-holiday-sync-hk` command to crontab
     """
 
-    def __init__(self, start=start_default, end=end_default):
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            _all_days = date_range(start, end, freq=self.day, tz="UTC")
+    def __init__(
+        self, start=start_default, end=None, schedule_cache_dir=None, lazy_minutes=False
+    ):
+        """
+        :param schedule_cache_dir: directory of the on-disk schedule cache, see
+            cn_stock_holidays.schedule_cache, CN_STOCK_HOLIDAYS_SCHEDULE_CACHE
+            is used if None and the cache is disabled if neither is set. The
+            cache is only used with lazy_minutes=True.
+        :param lazy_minutes: experimental, set the attributes of
+            TradingCalendar.__init__ with cached_schedule.init_calendar so the
+            minutes of the whole window are only built when they are needed.
+            It follows private attributes of zipline 1.0 - 1.3 and is ignored
+            with a warning for other versions.
+        """
+        if end is None:
+            end = default_end()
 
-        self._lunch_break_starts = days_at_time(
-            _all_days, lunch_break_start, self.tz, 0
-        )
-        self._lunch_break_ends = days_at_time(_all_days, lunch_break_end, self.tz, 0)
+        if schedule_cache_dir is not None and not lazy_minutes:
+            warnings.warn(
+                "schedule_cache_dir is only used with lazy_minutes=True",
+                RuntimeWarning,
+            )
+
+        if lazy_minutes and not zipline_init_supported():
+            warnings.warn(
+                "lazy_minutes requires the TradingCalendar of zipline 1.0 - 1.3, "
+                "the calendar is built with TradingCalendar.__init__",
+                RuntimeWarning,
+            )
+            lazy_minutes = False
+
+        if lazy_minutes:
+            # like TradingCalendar.__init__, without building all the minutes
+            schedule = calendar_schedule(
+                self,
+                get_holiday_index(),
+                lunch_break_start,
+                lunch_break_end,
+                start,
+                end,
+                cache_dir=schedule_cache_dir,
+            )
+            init_calendar(self, schedule, start, end)
+        else:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                _all_days = date_range(start, end, freq=self.day, tz="UTC")
+
+            self._lunch_break_starts = days_at_time(
+                _all_days, lunch_break_start, self.tz, 0
+            )
+            self._lunch_break_ends = days_at_time(
+                _all_days, lunch_break_end, self.tz, 0
+            )
 
-        TradingCalendar.__init__(self, start=start_default, end=end_default)
+            TradingCalendar.__init__(self, start=start, end=end)
 
     @property
     def name(self):
@@ -67,7 +145,7 @@ class HKExchangeCalendar(TradingCalendar):
 
     @property
     def adhoc_holidays(self):
-        return [Timestamp(t, tz=pytz.UTC) for t in get_cached(use_list=True)]
+        return get_holiday_index()
 
     @property
     @remember_last
@@ -75,54 +153,54 @@ class HKExchangeCalendar(TradingCalendar):
         """
         Returns a DatetimeIndex representing all the minutes in this calendar.
         """
-        opens_in_ns = self._opens.values.astype("datetime64[ns]")
-
-        closes_in_ns = self._closes.values.astype("datetime64[ns]")
-
-        lunch_break_start_in_ns = self._lunch_break_starts.values.astype(
-            "datetime64[ns]"
+        all_minutes = two_segment_minutes(
+            self._opens.values,
+            self._lunch_break_starts.values,
+            self._lunch_break_ends.values,
+            self._closes.values,
         )
-        lunch_break_ends_in_ns = self._lunch_break_ends.values.astype("datetime64[ns]")
-
-        deltas_before_lunch = lunch_break_start_in_ns - opens_in_ns
-        deltas_after_lunch = closes_in_ns - lunch_break_ends_in_ns
-
-        daily_before_lunch_sizes = (deltas_before_lunch / NANOS_IN_MINUTE) + 1
-        daily_after_lunch_sizes = (deltas_after_lunch / NANOS_IN_MINUTE) + 1
-
-        daily_sizes = daily_before_lunch_sizes + daily_after_lunch_sizes
-
-        num_minutes = np.sum(daily_sizes).astype(np.int64)
-
-        # One allocation for the entire thing. This assumes that each day
-        # represents a contiguous block of minutes.
-        all_minutes = np.empty(num_minutes, dtype="datetime64[ns]")
-
-        idx = 0
-        for day_idx, size in enumerate(daily_sizes):
-            # lots of small allocations, but it's fast enough for now.
-
-            # size is a np.timedelta64, so we need to int it
-            size_int = int(size)
+        return DatetimeIndex(all_minutes).tz_localize("UTC")
 
-            before_lunch_size_int = int(daily_before_lunch_sizes[day_idx])
-            after_lunch_size_int = int(daily_after_lunch_sizes[day_idx])
+    @cached_property
+    def _trading_minutes_nanos(self):
+        # set by TradingCalendar.__init__, with lazy_minutes it is only built
+        # by the zipline APIs which need all the minutes
+        return self.all_minutes.asi8
+
+    @lazyval
+    def _minute_windows(self):
+        return MinuteWindows(
+            self._opens.values,
+            self._lunch_break_starts.values,
+            self._lunch_break_ends.values,
+            self._closes.values,
+            maxsize=minute_window_cache_size,
+        )
 
-            # print("idx:{}, before_lunch_size_int: {}".format(idx, before_lunch_size_int))
-            all_minutes[idx : (idx + before_lunch_size_int)] = np.arange(
-                opens_in_ns[day_idx],
-                lunch_break_start_in_ns[day_idx] + NANOS_IN_MINUTE,
-                NANOS_IN_MINUTE,
-            )
+    def minutes_for_sessions(self, start_session_label, end_session_label):
+        """
+        Returns a DatetimeIndex of the minutes of the sessions from
+        start_session_label to end_session_label, both included. Only these
+        minutes are computed, without building all_minutes.
+        """
+        first = self.all_sessions.searchsorted(start_session_label, side="left")
+        last = self.all_sessions.searchsorted(end_session_label, side="right") - 1
+        minutes = self._minute_windows.for_sessions(first, last)
+        return DatetimeIndex(minutes).tz_localize("UTC")
 
-            all_minutes[(idx + before_lunch_size_int) : (idx + size_int)] = np.arange(
-                lunch_break_ends_in_ns[day_idx],
-                closes_in_ns[day_idx] + NANOS_IN_MINUTE,
-                NANOS_IN_MINUTE,
-            )
+    def minutes_for_sessions_in_range(self, start_session_label, end_session_label):
+        return self.minutes_for_sessions(start_session_label, end_session_label)
 
-            idx += size_int
-        return DatetimeIndex(all_minutes).tz_localize("UTC")
+    def minutes_in_range(self, start_minute, end_minute):
+        """
+        Returns a DatetimeIndex of the trading minutes from start_minute to
+        end_minute, both included, computed from the sessions of the range
+        only.
+        """
+        minutes = self._minute_windows.in_range(
+            Timestamp(start_minute).value, Timestamp(end_minute).value
+        )
+        return DatetimeIndex(minutes).tz_localize("UTC")
 
 
 if __name__ == "__main__":
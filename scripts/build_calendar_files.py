@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Build the binary calendar files shipped next to the package data files.
+
+data.txt / data_hk.txt stay the source of truth, this script writes
+data.bin / data_hk.bin which are loaded with mmap at runtime. It runs
+before `uv build`, the binary files are not tracked by git.
+
+Usage:
+    python scripts/build_calendar_files.py
+    # or
+    uv run python scripts/build_calendar_files.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from cn_stock_holidays.calendar_file import binary_path, build_calendar_file
+
+
+def main():
+    package_dir = project_root / "cn_stock_holidays"
+    for filename in sorted(package_dir.glob("*.txt")):
+        build_calendar_file(str(filename))
+        print(f"built {os.path.relpath(binary_path(str(filename)), project_root)}")
+
+
+if __name__ == "__main__":
+    main()
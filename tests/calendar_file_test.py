@@ -0,0 +1,100 @@
+# coding: utf-8
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from cn_stock_holidays.calendar_file import (
+    binary_path,
+    get_from_file_with_half_day,
+    load_calendar_file,
+    read_calendar_file,
+    _read_digest,
+)
+from cn_stock_holidays.common import _get_from_file_with_half_day, int_to_date
+from cn_stock_holidays.trading_index import TradingDayIndex
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), "..", "cn_stock_holidays")
+
+
+class TestCalendarFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "data_hk.txt")
+        shutil.copy(os.path.join(PACKAGE_DIR, "data_hk.txt"), self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_binary_file_round_trip(self):
+        self.assertFalse(os.path.exists(binary_path(self.filename)))
+        holidays, half_days, index = load_calendar_file(
+            self.filename, write_binary=True
+        )
+        self.assertTrue(os.path.exists(binary_path(self.filename)))
+
+        mapped = read_calendar_file(self.filename, _read_digest(self.filename))
+        self.assertIsNotNone(mapped)
+        mapped_holidays, mapped_half_days, mapped_index = mapped
+        self.assertEqual(
+            (mapped_holidays, mapped_half_days),
+            _get_from_file_with_half_day(self.filename),
+        )
+        self.assertIsInstance(mapped_index.days, memoryview)
+
+        expected = TradingDayIndex(holidays, half_days)
+        self.assertEqual(
+            (mapped_index.first, mapped_index.last, mapped_index.horizon),
+            (expected.first, expected.last, expected.horizon),
+        )
+        self.assertEqual(bytes(mapped_index.days), bytes(expected.days))
+        self.assertEqual(list(mapped_index.sessions), list(expected.sessions))
+        self.assertEqual(list(mapped_index.positions), list(expected.positions))
+        self.assertEqual(
+            mapped_index.shift_trading_days(int_to_date(20251224), -3),
+            expected.shift_trading_days(int_to_date(20251224), -3),
+        )
+
+    def test_binary_file_is_not_written_by_default(self):
+        # e.g. the package data files, whose binary files are built at build time
+        holidays, half_days, _index = load_calendar_file(self.filename)
+        self.assertFalse(os.path.exists(binary_path(self.filename)))
+        self.assertEqual(
+            (holidays, half_days), _get_from_file_with_half_day(self.filename)
+        )
+
+    def test_rebuilt_when_text_file_changes(self):
+        load_calendar_file(self.filename, write_binary=True)
+        with open(self.filename, "a") as f:
+            f.write("20271231\n")
+
+        self.assertIsNone(
+            read_calendar_file(self.filename, _read_digest(self.filename))
+        )
+        holidays, _half_days, index = load_calendar_file(
+            self.filename, write_binary=True
+        )
+        self.assertIn(datetime.date(2027, 12, 31), holidays)
+        self.assertFalse(index.is_trading_day(datetime.date(2027, 12, 31)))
+        self.assertIsNotNone(
+            read_calendar_file(self.filename, _read_digest(self.filename))
+        )
+
+    def test_invalid_binary_file_is_ignored(self):
+        with open(binary_path(self.filename), "wb") as f:
+            f.write(b"not a calendar file")
+        holidays, half_days, _index = load_calendar_file(self.filename)
+        self.assertEqual(
+            (holidays, half_days), _get_from_file_with_half_day(self.filename)
+        )
+
+    def test_get_from_file_with_half_day(self):
+        self.assertEqual(
+            get_from_file_with_half_day(self.filename),
+            _get_from_file_with_half_day(self.filename),
+        )
+        holidays, half_days = get_from_file_with_half_day(self.filename, use_list=True)
+        self.assertEqual(holidays, sorted(holidays))
+        self.assertIn(int_to_date(20251224), half_days)
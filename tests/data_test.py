@@ -41,6 +41,97 @@ class TestData(unittest.TestCase):
         data = previous_trading_day(datetime.date.today())
         self.assertLess(data, datetime.date.today())
 
+    def test_next_previous_trading_day_match_day_by_day_walk(self):
+        def walk(dt, step):
+            while True:
+                dt = dt + datetime.timedelta(days=step)
+                if is_trading_day(dt):
+                    return dt
+
+        index = get_trading_day_index()
+        first = datetime.date.fromordinal(index.first)
+        last = datetime.date.fromordinal(index.last)
+        dt = first - datetime.timedelta(days=10)
+        while dt <= last + datetime.timedelta(days=10):
+            self.assertEqual(next_trading_day(dt), walk(dt, 1), dt)
+            self.assertEqual(previous_trading_day(dt), walk(dt, -1), dt)
+            dt = dt + datetime.timedelta(days=1)
+
+    def test_shift_trading_days(self):
+        dt = int_to_date(20170125)
+        self.assertEqual(shift_trading_days(dt, 0), dt)
+        expected = dt
+        for n in range(1, 30):
+            expected = next_trading_day(expected)
+            self.assertEqual(shift_trading_days(dt, n), expected)
+        expected = dt
+        for n in range(1, 30):
+            expected = previous_trading_day(expected)
+            self.assertEqual(shift_trading_days(dt, -n), expected)
+
+        self.assertEqual(
+            shift_trading_days(datetime.datetime(2017, 1, 28), 1),
+            next_trading_day(int_to_date(20170128)),
+        )
+
+    def test_shift_trading_days_past_horizon(self):
+        index = get_trading_day_index()
+        last = datetime.date.fromordinal(index.last)
+        with self.assertRaises(ValueError):
+            shift_trading_days(last, 1)
+        with self.assertRaises(ValueError):
+            shift_trading_days(last + datetime.timedelta(days=1), -1)
+        with self.assertRaises(ValueError):
+            shift_trading_days(datetime.date.fromordinal(index.first), -1)
+
+    def test_shift_trading_days_stops_at_data_horizon(self):
+        # days after the last listed holiday are not known to be trading days
+        horizon = data_horizon()
+        last_session = previous_trading_day(horizon + datetime.timedelta(days=1))
+        self.assertEqual(
+            shift_trading_days(last_session, -1), previous_trading_day(last_session)
+        )
+        with self.assertRaises(ValueError):
+            shift_trading_days(last_session, 1)
+        with self.assertRaises(ValueError):
+            shift_trading_days(horizon + datetime.timedelta(days=1), -1)
+        with self.assertRaises(ValueError):
+            shift_trading_days(horizon - datetime.timedelta(days=10), 30)
+
+    def test_count_trading_days(self):
+        index = get_trading_day_index()
+        first = datetime.date.fromordinal(index.first)
+        last = datetime.date.fromordinal(index.last)
+        windows = [
+            (int_to_date(20170125), int_to_date(20170131)),
+            (int_to_date(20170131), int_to_date(20170125)),
+            (first - datetime.timedelta(days=30), first + datetime.timedelta(days=30)),
+            (last - datetime.timedelta(days=30), last + datetime.timedelta(days=30)),
+            (first - datetime.timedelta(days=3), last + datetime.timedelta(days=3)),
+            (last + datetime.timedelta(days=1), last + datetime.timedelta(days=400)),
+        ]
+        for start, end in windows:
+            self.assertEqual(
+                count_trading_days(start, end),
+                len(list(trading_days_between(start, end))),
+                (start, end),
+            )
+
+        self.assertEqual(
+            count_trading_days(
+                datetime.datetime(2017, 1, 25, 10), datetime.datetime(2017, 1, 31)
+            ),
+            len(
+                list(trading_days_between(int_to_date(20170125), int_to_date(20170131)))
+            ),
+        )
+
+    def test_data_horizon(self):
+        self.assertEqual(data_horizon(), max(get_cached()))
+        today = datetime.date.today()
+        self.assertEqual(days_until_expiry(), (max(get_cached()) - today).days)
+        self.assertEqual(check_expired(), not any(d > today for d in get_cached()))
+
     def test_cache_clear(self):
         data = get_cached()
         get_cached.cache_clear()
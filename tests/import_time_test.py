@@ -0,0 +1,53 @@
+# coding: utf-8
+
+import subprocess
+import sys
+import unittest
+
+# cumulative import time budget for the package, in microseconds
+IMPORT_TIME_BUDGET_US = 80000
+
+# these are only needed to sync data or to run the command line tool
+LAZY_MODULES = ("requests", "urllib3", "click", "logging")
+
+
+def import_times(code):
+    """
+    run code in a new interpreter with -X importtime
+    :return: dict of module name -> cumulative import time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def test_import_package(self):
+        times = import_times("import cn_stock_holidays")
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, times)
+        self.assertLess(times["cn_stock_holidays"], IMPORT_TIME_BUDGET_US)
+
+    def test_import_hk(self):
+        times = import_times("import cn_stock_holidays.data_hk")
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_command_line_tool(self):
+        times = import_times(
+            "from cn_stock_holidays.tools import cmd; "
+            "cmd.main(['-s', '20170101', '-e', '20170110'], standalone_mode=False)"
+        )
+        self.assertNotIn("requests", times)
+        self.assertNotIn("cn_stock_holidays.data_hk", times)
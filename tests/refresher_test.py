@@ -0,0 +1,143 @@
+# coding: utf-8
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from cn_stock_holidays import remote
+from cn_stock_holidays.common import int_to_date
+from cn_stock_holidays.meta_functions import (
+    meta_data_horizon,
+    meta_days_until_expiry,
+    meta_get_cached_from_snapshot,
+    meta_get_remote_and_cache,
+    meta_get_snapshot,
+    meta_get_trading_day_index,
+)
+from cn_stock_holidays.refresher import BackgroundRefresher
+from tests.remote_test import requests, start_server
+
+NEW_DATA = b"20170127\n20991231\n"
+
+
+@unittest.skipIf(requests is None, "requests is not installed")
+class TestBackgroundRefresher(unittest.TestCase):
+    def setUp(self):
+        self.server, base_url = start_server()
+        self.server.files["data.txt"] = NEW_DATA
+        original = remote.DATA_BASE_URL
+        remote.DATA_BASE_URL = base_url
+        self.addCleanup(setattr, remote, "DATA_BASE_URL", original)
+
+        # expired data in the cache
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmpdir, "data.txt")
+        with open(self.cache_path, "w") as f:
+            f.write("20170127\n")
+
+        get_cache_path = lambda: self.cache_path
+        self.get_snapshot = meta_get_snapshot(
+            get_cache_path=get_cache_path, check_interval=None
+        )
+        get_cached = meta_get_cached_from_snapshot(self.get_snapshot)
+        self.get_trading_day_index = meta_get_trading_day_index(
+            get_snapshot=self.get_snapshot
+        )
+        self.days_until_expiry = meta_days_until_expiry(
+            meta_data_horizon(self.get_trading_day_index)
+        )
+        self.refresher = BackgroundRefresher(
+            days_until_expiry=self.days_until_expiry,
+            get_remote_and_cache=meta_get_remote_and_cache(
+                get_cached=get_cached, get_cache_path=get_cache_path
+            ),
+            name="test",
+        )
+
+    def tearDown(self):
+        self.refresher.stop(timeout=5)
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_refresh_expired_data(self):
+        self.assertLess(self.days_until_expiry(), 0)
+        self.assertTrue(self.refresher.refresh_once())
+
+        self.assertEqual(
+            self.get_snapshot().days_off, {int_to_date(20170127), int_to_date(20991231)}
+        )
+        status = self.refresher.status()
+        self.assertEqual((status["checks"], status["successes"]), (1, 1))
+        self.assertIsNotNone(status["last_success"])
+        self.assertIsNone(status["last_failure"])
+
+        # not expired any more
+        self.assertFalse(self.refresher.refresh_once())
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.refresher.status()["checks"], 2)
+
+    def test_min_days_left(self):
+        self.refresher.refresh_once()
+        self.assertFalse(self.refresher.refresh_once(min_days_left=30))
+        self.assertTrue(self.refresher.refresh_once(min_days_left=100000))
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_failure_is_recorded(self):
+        del self.server.files["data.txt"]
+        with self.assertLogs("cn_stock_holidays.refresher", "WARNING"):
+            self.assertIsNone(self.refresher.refresh_once())
+
+        status = self.refresher.status()
+        self.assertEqual((status["successes"], status["failures"]), (0, 1))
+        self.assertIsNotNone(status["last_failure"])
+        self.assertIn("HTTPError", status["last_error"])
+        # the current data stays published
+        self.assertEqual(self.get_snapshot().days_off, {int_to_date(20170127)})
+
+    def test_thread(self):
+        self.refresher.start(interval=0.01)
+        self.assertTrue(self.refresher.status()["running"])
+        with self.assertRaises(RuntimeError):
+            self.refresher.start()
+        self.wait_for(lambda: self.refresher.status()["checks"] >= 3)
+
+        self.refresher.stop(timeout=5)
+        self.assertFalse(self.refresher.status()["running"])
+        self.assertEqual(self.refresher.status()["successes"], 1)
+        self.assertEqual(len(self.get_snapshot().days_off), 2)
+
+    def test_lookups_do_not_wait_for_refresh(self):
+        self.server.delay = 0.5
+        snapshot = self.get_snapshot()
+        self.refresher.start(interval=60)
+        self.wait_for(lambda: self.server.requests)
+
+        start = time.monotonic()
+        index = self.get_trading_day_index()
+        self.assertFalse(index.is_trading_day(int_to_date(20170127)))
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertIs(self.get_snapshot(), snapshot)
+
+        self.wait_for(lambda: self.refresher.status()["successes"])
+        self.assertIsNot(self.get_snapshot(), snapshot)
+
+    def test_asyncio_task(self):
+        async def run():
+            task = asyncio.ensure_future(self.refresher.run_async(interval=0.01))
+            while not self.refresher.status()["successes"]:
+                await asyncio.sleep(0.01)
+            self.refresher.stop()
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(run())
+        self.assertEqual(len(self.get_snapshot().days_off), 2)
@@ -0,0 +1,355 @@
+# coding: utf-8
+
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cn_stock_holidays import data, data_hk, remote
+from cn_stock_holidays.common import atomic_write
+from cn_stock_holidays.meta_functions import (
+    meta_get_cached_from_snapshot,
+    meta_get_remote_and_cache,
+    meta_get_snapshot,
+    meta_sync_data_async,
+)
+from cn_stock_holidays.snapshot import CalendarSnapshot
+
+try:
+    import requests
+except ImportError:  # pragma: no cover
+    requests = None
+
+
+class DataFileHandler(BaseHTTPRequestHandler):
+    """
+    serve server.files like raw.githubusercontent.com, with ETag and
+    Last-Modified validators, server.requests records the request headers
+    """
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.server.barrier is not None:
+            # only answer when all expected requests are in flight together
+            try:
+                self.server.barrier.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                self.send_error(500)
+                return
+        time.sleep(self.server.delay)
+        name = self.path.rsplit("/", 1)[-1]
+        if name not in self.server.files:
+            self.send_error(404)
+            return
+
+        content = self.server.files[name]
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:16]
+        if self.server.use_etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        if self.server.use_etag:
+            self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Fri, 01 Jan 2027 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DataFileHandler)
+    server.files = {}
+    server.requests = []
+    server.use_etag = True
+    server.barrier = None
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, "http://127.0.0.1:%d/data/" % server.server_address[1]
+
+
+@unittest.skipIf(requests is None, "requests is not installed")
+class TestConditionalSync(unittest.TestCase):
+    def setUp(self):
+        self.server, self.base_url = start_server()
+        self.server.files["data.txt"] = b"20170127\n"
+        self.server.files["data_hk.txt"] = b"20171225\n20171226\n"
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmpdir, "data.txt")
+        self.get_cached = meta_get_cached_from_snapshot(
+            meta_get_snapshot(
+                get_cache_path=lambda: self.cache_path, check_interval=None
+            )
+        )
+        # counts the loads of the cache file
+        patcher = mock.patch.object(
+            CalendarSnapshot, "from_file", side_effect=CalendarSnapshot.from_file
+        )
+        self.from_file = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        original = remote.DATA_BASE_URL
+        remote.DATA_BASE_URL = self.base_url
+        self.addCleanup(setattr, remote, "DATA_BASE_URL", original)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    @property
+    def loads(self):
+        return self.from_file.call_count
+
+    def sync(self, data_file_name="data.txt"):
+        return meta_get_remote_and_cache(
+            get_cached=self.get_cached,
+            get_cache_path=lambda: self.cache_path,
+            data_file_name=data_file_name,
+        )()
+
+    def test_not_modified(self):
+        self.assertEqual(len(self.sync()), 1)
+        self.assertEqual(self.loads, 1)
+        meta = remote.read_sidecar(self.cache_path)
+        self.assertEqual(
+            meta["sha256"], hashlib.sha256(self.server.files["data.txt"]).hexdigest()
+        )
+        mtime = os.stat(self.cache_path).st_mtime_ns
+
+        self.assertEqual(len(self.sync()), 1)
+        self.assertEqual(self.server.requests[-1][1]["If-None-Match"], meta["etag"])
+        self.assertEqual(os.stat(self.cache_path).st_mtime_ns, mtime)
+        self.assertEqual(self.loads, 1)
+
+    def test_unchanged_content_without_etag(self):
+        self.server.use_etag = False
+        self.sync()
+        mtime = os.stat(self.cache_path).st_mtime_ns
+
+        self.assertEqual(len(self.sync()), 1)
+        self.assertNotIn("If-None-Match", self.server.requests[-1][1])
+        self.assertEqual(os.stat(self.cache_path).st_mtime_ns, mtime)
+        self.assertEqual(self.loads, 1)
+
+    def test_modified(self):
+        self.sync()
+        self.server.files["data.txt"] = b"20170127\n20170130\n"
+        self.assertEqual(len(self.sync()), 2)
+        self.assertEqual(self.loads, 2)
+
+    def test_edited_cache_file_is_downloaded_again(self):
+        self.sync()
+        with open(self.cache_path, "w") as f:
+            f.write("20170127\n20170130\n")
+        self.get_cached.cache_clear()
+
+        self.assertEqual(len(self.sync()), 1)
+        self.assertNotIn("If-None-Match", self.server.requests[-1][1])
+
+    def test_data_file_name(self):
+        self.assertEqual(len(self.sync("data_hk.txt")), 2)
+        self.assertEqual(self.server.requests[-1][0], "/data/data_hk.txt")
+
+    def test_single_flight_between_processes(self):
+        self.server.delay = 1
+        code = (
+            "import sys; from cn_stock_holidays.remote import fetch_to_cache; "
+            "print(fetch_to_cache(sys.argv[1], sys.argv[2]))"
+        )
+        processes = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-c",
+                    code,
+                    self.base_url + "data.txt",
+                    self.cache_path,
+                ],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for _ in range(4)
+        ]
+        outputs = [process.communicate()[0].strip() for process in processes]
+
+        self.assertEqual(outputs, ["True"] * 4)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(self.get_cached()), 1)
+
+    def test_cache_file_is_replaced(self):
+        self.sync()
+        inode = os.stat(self.cache_path).st_ino
+        self.server.files["data.txt"] = b"20170127\n20170130\n"
+        self.sync()
+
+        self.assertNotEqual(os.stat(self.cache_path).st_ino, inode)
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir)),
+            # data.bin is the binary calendar file written by the load
+            ["data.bin", "data.txt", "data.txt.lock", "data.txt.meta.json"],
+        )
+
+    def test_failed_atomic_write_keeps_file(self):
+        self.sync()
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.cache_path) as f:
+                f.write(b"2017")
+                raise RuntimeError()
+        with open(self.cache_path, "rb") as f:
+            self.assertEqual(f.read(), self.server.files["data.txt"])
+        self.assertEqual(len(os.listdir(self.tmpdir)), 4)
+
+    def test_error_keeps_cache(self):
+        self.sync()
+        with self.assertRaises(requests.HTTPError):
+            self.sync("missing.txt")
+        with open(self.cache_path, "rb") as f:
+            self.assertEqual(f.read(), self.server.files["data.txt"])
+
+
+@unittest.skipIf(requests is None, "requests is not installed")
+class TestSyncMarkets(unittest.TestCase):
+    def setUp(self):
+        self.server, base_url = start_server()
+        self.server.files["data.txt"] = b"20170127\n"
+        self.server.files["data_hk.txt"] = b"20171225\n20171226\n20251224,h\n"
+
+        # the cache files of the markets are under ~/.cn_stock_holidays, the
+        # data is reloaded from the real cache after HOME is restored
+        for market in (data, data_hk):
+            self.addCleanup(market.get_cached.cache_clear)
+        self.tmpdir = tempfile.mkdtemp()
+        patcher = mock.patch.dict(os.environ, {"HOME": self.tmpdir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        original = remote.DATA_BASE_URL
+        remote.DATA_BASE_URL = base_url
+        self.addCleanup(setattr, remote, "DATA_BASE_URL", original)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_sync_all_markets_concurrently(self):
+        self.server.barrier = threading.Barrier(len(remote.MARKETS))
+        result = remote.sync_markets(force=True)
+
+        self.assertEqual(result, {"cn": True, "hk": True})
+        self.assertEqual(
+            sorted(path for path, _headers in self.server.requests),
+            ["/data/data.txt", "/data/data_hk.txt"],
+        )
+        self.assertEqual(len(data.get_cached()), 1)
+        self.assertEqual(len(data_hk.get_cached()), 3)
+        self.assertEqual(
+            [len(days) for days in data_hk.get_cached_with_half_day()], [2, 1]
+        )
+
+    def test_shared_session(self):
+        session = remote.new_session()
+        self.addCleanup(session.close)
+        remote.sync_markets(["cn"], force=True, session=session)
+        remote.sync_markets(["cn"], force=True, session=session, timeout=1)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIn("If-None-Match", self.server.requests[-1][1])
+
+    def test_error_is_raised_after_all_downloads(self):
+        del self.server.files["data_hk.txt"]
+        with self.assertRaises(requests.HTTPError):
+            remote.sync_markets(force=True)
+        self.assertEqual(len(data.get_cached()), 1)
+
+    def test_not_expired_markets_are_skipped(self):
+        with mock.patch.object(
+            data, "check_expired", return_value=False
+        ), mock.patch.object(data_hk, "check_expired", return_value=True):
+            result = remote.sync_markets(["cn", "hk"])
+        self.assertEqual(result, {"cn": False, "hk": True})
+        self.assertEqual(
+            [path for path, _headers in self.server.requests], ["/data/data_hk.txt"]
+        )
+
+
+@unittest.skipIf(requests is None, "requests is not installed")
+class TestAsyncSync(unittest.TestCase):
+    def setUp(self):
+        self.server, base_url = start_server()
+        self.server.files["data.txt"] = b"20170127\n"
+        self.server.files["data_hk.txt"] = b"20171225\n20171226\n20251224,h\n"
+
+        for market in (data, data_hk):
+            self.addCleanup(market.get_cached.cache_clear)
+        self.tmpdir = tempfile.mkdtemp()
+        patcher = mock.patch.dict(os.environ, {"HOME": self.tmpdir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        original = remote.DATA_BASE_URL
+        remote.DATA_BASE_URL = base_url
+        self.addCleanup(setattr, remote, "DATA_BASE_URL", original)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_gather_markets(self):
+        self.server.barrier = threading.Barrier(2)
+
+        async def sync():
+            return await asyncio.gather(
+                data.get_remote_and_cache_async(),
+                data_hk.get_remote_and_cache_with_half_day_async(),
+            )
+
+        shsz_days, (holidays, half_days) = asyncio.run(sync())
+        self.assertEqual(len(shsz_days), 1)
+        self.assertEqual((len(holidays), len(half_days)), (2, 1))
+        self.assertIs(data_hk.get_cached_with_half_day()[0], holidays)
+
+    def test_event_loop_is_not_blocked(self):
+        self.server.delay = 0.5
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def sync():
+            ticker = asyncio.ensure_future(tick())
+            result = await remote.sync_markets_async(force=True)
+            ticker.cancel()
+            return result
+
+        self.assertEqual(asyncio.run(sync()), {"cn": True, "hk": True})
+        self.assertGreater(len(ticks), 20)
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.2)
+
+    def test_sync_data_async(self):
+        for expired in (True, False):
+            sync_data_async = meta_sync_data_async(
+                check_expired=lambda: expired,
+                get_remote_and_cache_async=data.get_remote_and_cache_async,
+            )
+            self.assertEqual(asyncio.run(sync_data_async()), expired)
+        self.assertEqual(
+            [path for path, _headers in self.server.requests], ["/data/data.txt"]
+        )
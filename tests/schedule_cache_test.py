@@ -0,0 +1,122 @@
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+try:
+    import numpy as np
+
+    from cn_stock_holidays.schedule_cache import (
+        ENV_VAR,
+        SCHEDULE_FIELDS,
+        MAX_AGE_DAYS,
+        load_schedule,
+        prune_schedules,
+        save_schedule,
+        schedule_cache_dir,
+        schedule_key,
+        schedule_path,
+    )
+except ImportError:  # numpy is optional
+    np = None
+
+SESSION_TIMES = ("SHSZ", "Asia/Shanghai", "09:31", "15:00", "11:30", "13:01")
+START = 662083200 * 10**9  # 1990-12-25
+END = 1704067200 * 10**9  # 2024-01-01
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestScheduleCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        sessions = np.array(
+            ["2024-01-02", "2024-01-03", "2024-01-04"], dtype="datetime64[ns]"
+        )
+        self.schedule = {
+            name: sessions + np.timedelta64(i, "h")
+            for i, name in enumerate(SCHEDULE_FIELDS)
+        }
+        self.holidays = np.array(["2024-01-01"], dtype="datetime64[ns]").view(np.int64)
+
+    def test_save_and_load(self):
+        path = schedule_path(
+            os.path.join(self.tmpdir, "schedules"),
+            schedule_key(self.holidays, SESSION_TIMES, START, END),
+        )
+        self.assertIsNone(load_schedule(path))
+
+        save_schedule(path, self.schedule)
+        loaded = load_schedule(path)
+        self.assertEqual(set(loaded), set(SCHEDULE_FIELDS))
+        for name in SCHEDULE_FIELDS:
+            np.testing.assert_array_equal(loaded[name], self.schedule[name])
+            self.assertEqual(loaded[name].dtype, np.dtype("datetime64[ns]"))
+            # backed by the mmapped file
+            self.assertIsInstance(loaded[name].base, np.memmap)
+            self.assertFalse(loaded[name].flags.writeable)
+
+    def test_key(self):
+        key = schedule_key(self.holidays, SESSION_TIMES, START, END)
+        self.assertEqual(key, schedule_key(self.holidays, SESSION_TIMES, START, END))
+
+        other_holidays = np.append(self.holidays, self.holidays[0] + 86400 * 10**9)
+        other_times = SESSION_TIMES[:-1] + ("13:00",)
+        keys = {
+            schedule_key(other_holidays, SESSION_TIMES, START, END),
+            schedule_key(self.holidays, other_times, START, END),
+            schedule_key(self.holidays, SESSION_TIMES, START + 1, END),
+            schedule_key(self.holidays, SESSION_TIMES, START, END + 1),
+        }
+        self.assertEqual(len(keys), 4)
+        self.assertNotIn(key, keys)
+
+    def test_invalid_file(self):
+        path = os.path.join(self.tmpdir, "schedule-invalid.npy")
+        with open(path, "wb") as f:
+            f.write(b"not a schedule")
+        self.assertIsNone(load_schedule(path))
+
+        np.save(path, np.zeros((2, 3), dtype=np.int64))
+        self.assertIsNone(load_schedule(path))
+
+    def test_disabled_by_default(self):
+        with mock.patch.dict(os.environ, {ENV_VAR: ""}):
+            self.assertIsNone(schedule_cache_dir())
+            self.assertEqual(schedule_cache_dir(self.tmpdir), self.tmpdir)
+        with mock.patch.dict(os.environ, {ENV_VAR: self.tmpdir}):
+            self.assertEqual(schedule_cache_dir(), self.tmpdir)
+
+    def test_unused_files_are_pruned(self):
+        old = time.time() - MAX_AGE_DAYS * 86400 - 60
+        paths = [
+            schedule_path(
+                self.tmpdir, schedule_key(self.holidays, SESSION_TIMES, START, end)
+            )
+            for end in (END, END + 1, END + 2)
+        ]
+        for path in paths[:2]:
+            save_schedule(path, self.schedule)
+        for path in paths[:2]:
+            os.utime(path, (old, old))
+        other_file = os.path.join(self.tmpdir, "data.txt")
+        open(other_file, "w").close()
+        os.utime(other_file, (old, old))
+
+        # a load marks the file as used
+        self.assertIsNotNone(load_schedule(paths[0]))
+        save_schedule(paths[2], self.schedule)
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir)),
+            sorted(
+                [os.path.basename(paths[0]), os.path.basename(paths[2]), "data.txt"]
+            ),
+        )
+        self.assertEqual(prune_schedules(self.tmpdir, max_age=3600), 0)
+        self.assertEqual(prune_schedules(self.tmpdir, max_age=-60), 2)
+        self.assertEqual(os.listdir(self.tmpdir), ["data.txt"])
@@ -0,0 +1,130 @@
+# coding: utf-8
+
+import datetime
+import unittest
+
+import cn_stock_holidays.data as shsz
+
+try:
+    import numpy as np
+
+    from cn_stock_holidays.session_minutes import (
+        MinuteWindows,
+        segment_sizes,
+        two_segment_minutes,
+    )
+except ImportError:  # numpy is optional
+    np = None
+
+# Asia/Shanghai in UTC: 9:31, 11:30, 13:01 and 15:00
+SHSZ_TIMES = ("01:31", "03:30", "05:01", "07:00")
+
+
+def schedule(days, times=SHSZ_TIMES):
+    days = np.asarray(days, dtype="datetime64[D]").astype("datetime64[ns]")
+    return [days + np.timedelta64(int(t[:2]) * 60 + int(t[3:]), "m") for t in times]
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestTwoSegmentMinutes(unittest.TestCase):
+    def test_one_session(self):
+        minutes = two_segment_minutes(*schedule(["2024-01-02"]))
+        self.assertEqual(len(minutes), 120 + 120)
+        self.assertEqual(minutes.dtype, np.dtype("datetime64[ns]"))
+        self.assertEqual(minutes[0], np.datetime64("2024-01-02T01:31"))
+        self.assertEqual(minutes[119], np.datetime64("2024-01-02T03:30"))
+        self.assertEqual(minutes[120], np.datetime64("2024-01-02T05:01"))
+        self.assertEqual(minutes[-1], np.datetime64("2024-01-02T07:00"))
+
+    def test_matches_per_session_ranges(self):
+        days = shsz.trading_days_between_array(
+            datetime.date(2023, 12, 1), datetime.date(2024, 3, 1)
+        )
+        opens, lunch_starts, lunch_ends, closes = schedule(days)
+        # uneven sessions, e.g. a half day without the afternoon
+        closes[5] = lunch_ends[5] - np.timedelta64(1, "m")
+        lunch_starts[7] = opens[7] + np.timedelta64(10, "m")
+
+        minute = np.timedelta64(1, "m")
+        expected = np.concatenate(
+            [
+                np.concatenate(
+                    [
+                        np.arange(opens[i], lunch_starts[i] + minute, minute),
+                        np.arange(lunch_ends[i], closes[i] + minute, minute),
+                    ]
+                )
+                for i in range(len(days))
+            ]
+        ).astype("datetime64[ns]")
+
+        result = two_segment_minutes(opens, lunch_starts, lunch_ends, closes)
+        np.testing.assert_array_equal(result, expected)
+
+        before_lunch, after_lunch = segment_sizes(
+            opens, lunch_starts, lunch_ends, closes
+        )
+        self.assertEqual((before_lunch[7], after_lunch[5]), (11, 0))
+        self.assertEqual(before_lunch.sum() + after_lunch.sum(), len(expected))
+
+    def test_empty(self):
+        self.assertEqual(len(two_segment_minutes(*schedule([]))), 0)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestMinuteWindows(unittest.TestCase):
+    def setUp(self):
+        days = shsz.trading_days_between_array(
+            datetime.date(2023, 12, 1), datetime.date(2024, 3, 1)
+        )
+        self.sessions = schedule(days)
+        self.all_minutes = two_segment_minutes(*self.sessions)
+        self.windows = MinuteWindows(*self.sessions, maxsize=2)
+
+    def test_for_sessions(self):
+        n = len(self.windows)
+        for first, last in [(0, 0), (3, 10), (0, n - 1), (n - 1, n - 1)]:
+            minutes = self.windows.for_sessions(first, last)
+            np.testing.assert_array_equal(
+                minutes, self.all_minutes[first * 240 : (last + 1) * 240]
+            )
+            self.assertFalse(minutes.flags.writeable)
+
+        # clamped to the sessions of the calendar
+        self.assertEqual(len(self.windows.for_sessions(-5, n + 5)), n * 240)
+        self.assertEqual(len(self.windows.for_sessions(5, 4)), 0)
+
+    def test_in_range(self):
+        cases = [
+            ("2023-12-05T02:00", "2023-12-20T06:00"),
+            # within the lunch break and outside the trading hours
+            ("2023-12-05T04:00", "2023-12-05T04:30"),
+            ("2023-12-05T08:00", "2023-12-06T01:00"),
+            ("2023-11-01T00:00", "2024-06-01T00:00"),
+            ("2024-01-02T01:31", "2024-01-02T01:31"),
+        ]
+        for start, end in cases:
+            start = np.datetime64(start, "ns")
+            end = np.datetime64(end, "ns")
+            expected = self.all_minutes[
+                (self.all_minutes >= start) & (self.all_minutes <= end)
+            ]
+            np.testing.assert_array_equal(self.windows.in_range(start, end), expected)
+        # nanoseconds since the epoch
+        np.testing.assert_array_equal(
+            self.windows.in_range(start.astype(np.int64), end.astype(np.int64)),
+            expected,
+        )
+
+    def test_cache_is_bounded(self):
+        first = self.windows.for_sessions(0, 1)
+        self.assertIs(self.windows.for_sessions(0, 1), first)
+        self.windows.for_sessions(2, 3)
+        self.windows.for_sessions(0, 1)
+        # (2, 3) is the least recently used window
+        self.windows.for_sessions(4, 5)
+        self.assertEqual(list(self.windows._cache), [(0, 1), (4, 5)])
+        self.assertIs(self.windows.for_sessions(0, 1), first)
+
+        self.windows.cache_clear()
+        self.assertIsNot(self.windows.for_sessions(0, 1), first)
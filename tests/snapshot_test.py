@@ -0,0 +1,266 @@
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from cn_stock_holidays.calendar_file import binary_path
+from cn_stock_holidays.common import _file_stamp, int_to_date
+from cn_stock_holidays.meta_functions import (
+    meta_get_cached_from_snapshot,
+    meta_get_holiday_index,
+    meta_get_snapshot,
+    meta_get_trading_day_index,
+    meta_is_trading_day,
+)
+from cn_stock_holidays.snapshot import CalendarSnapshot
+
+try:
+    import pandas as pd
+except ImportError:  # pandas is optional
+    pd = None
+
+HOLIDAY = int_to_date(20170127)
+LATER_HOLIDAY = int_to_date(20170130)
+
+
+class TestCalendarSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "data.txt")
+        self.write("20170127\n")
+
+        self.get_snapshot = meta_get_snapshot(
+            get_cache_path=lambda: self.path, check_interval=0
+        )
+        self.get_cached = meta_get_cached_from_snapshot(self.get_snapshot)
+        self.get_trading_day_index = meta_get_trading_day_index(
+            get_snapshot=self.get_snapshot
+        )
+        self.is_trading_day = meta_is_trading_day(
+            get_cached=self.get_cached,
+            get_trading_day_index=self.get_trading_day_index,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, content):
+        # replaced like a sync does, so the inode changes even within one clock tick
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
+
+    def test_immutable(self):
+        snapshot = self.get_snapshot()
+        with self.assertRaises(AttributeError):
+            snapshot.index = None
+        with self.assertRaises(AttributeError):
+            del snapshot.holidays
+        self.assertEqual(snapshot.days_off, {HOLIDAY})
+
+    def test_days_off_is_built_on_first_use(self):
+        snapshot = self.get_snapshot()
+        self.assertIs(snapshot.days_off, snapshot.holidays)
+
+        self.write("20170127\n20170130,h\n")
+        snapshot = self.get_snapshot.refresh()
+        self.assertIsNone(snapshot._days_off)
+        self.assertEqual(snapshot.days_off, {HOLIDAY, LATER_HOLIDAY})
+        self.assertIs(snapshot.days_off, snapshot.days_off)
+        self.assertEqual(snapshot.holidays, {HOLIDAY})
+
+    def test_refresh_swaps_snapshot(self):
+        snapshot = self.get_snapshot()
+        self.assertFalse(self.is_trading_day(HOLIDAY))
+        self.assertTrue(self.is_trading_day(LATER_HOLIDAY))
+
+        self.write("20170127\n20170130\n")
+        self.is_trading_day.cache_clear()
+
+        self.assertIsNot(self.get_snapshot(), snapshot)
+        self.assertFalse(self.is_trading_day(LATER_HOLIDAY))
+        # readers which still hold the old snapshot see consistent old data
+        self.assertTrue(snapshot.index.is_trading_day(LATER_HOLIDAY))
+        self.assertEqual(snapshot.days_off, {HOLIDAY})
+
+    def test_reload_when_file_changes(self):
+        snapshot = self.get_snapshot()
+        self.assertIs(self.get_snapshot(), snapshot)
+
+        self.write("20170127\n20170130\n")
+        # the reader which sees the change starts the reload and does not wait for it
+        self.assertEqual(len(self.get_cached()), 1)
+        self.get_snapshot.wait()
+        self.assertEqual(len(self.get_cached()), 2)
+
+        self.get_snapshot.check_interval = None
+        self.write("20170127\n")
+        self.assertEqual(len(self.get_cached()), 2)
+
+    def test_file_is_checked_when_timer_is_due(self):
+        get_snapshot = meta_get_snapshot(
+            get_cache_path=lambda: self.path, check_interval=0.2
+        )
+        snapshot = get_snapshot()
+        self.write("20170127\n20170130\n")
+
+        with mock.patch(
+            "cn_stock_holidays.meta_functions._file_stamp", wraps=_file_stamp
+        ) as file_stamp:
+            # lookups before the timer fired only read the current snapshot
+            for _ in range(100):
+                self.assertIs(get_snapshot(), snapshot)
+            self.assertEqual(file_stamp.call_count, 0)
+
+            deadline = time.monotonic() + 5
+            while not get_snapshot.state["check"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            get_snapshot()
+            self.assertEqual(get_snapshot.wait().days_off, {HOLIDAY, LATER_HOLIDAY})
+            self.assertEqual(file_stamp.call_count, 2)
+
+    @unittest.skipIf(pd is None, "pandas is not installed")
+    def test_holiday_index(self):
+        get_holiday_index = meta_get_holiday_index(self.get_snapshot)
+        self.write("20170130\n20170127\n")
+        index = get_holiday_index()
+        self.assertEqual(
+            list(index),
+            [
+                pd.Timestamp("2017-01-27", tz="UTC"),
+                pd.Timestamp("2017-01-30", tz="UTC"),
+            ],
+        )
+        self.assertTrue(index.is_monotonic_increasing)
+        # built once per snapshot
+        self.assertIs(get_holiday_index(), index)
+
+        self.write("20170127\n")
+        self.get_snapshot()
+        self.get_snapshot.wait()
+        changed = get_holiday_index()
+        self.assertIsNot(changed, index)
+        self.assertEqual(list(changed), [pd.Timestamp("2017-01-27", tz="UTC")])
+        self.assertIs(get_holiday_index(), changed)
+
+    def test_binary_file_of_cache_is_rebuilt(self):
+        self.get_snapshot()
+        self.assertTrue(os.path.exists(binary_path(self.path)))
+
+    def test_package_data_without_cache(self):
+        os.remove(self.path)
+        with mock.patch(
+            "cn_stock_holidays.calendar_file.write_calendar_file"
+        ) as write_calendar_file, mock.patch(
+            "cn_stock_holidays.calendar_file.read_calendar_file", return_value=None
+        ):
+            # a stale binary file of the package data is not rebuilt
+            self.get_snapshot.refresh()
+        write_calendar_file.assert_not_called()
+        self.assertIsNone(self.get_snapshot().stamp)
+        self.assertIn(int_to_date(19910215), self.get_cached())
+
+    def test_changed_file_is_reloaded_in_background(self):
+        self.get_snapshot()
+        self.write("20170127\n20170130\n")
+
+        loads = []
+        from_file = CalendarSnapshot.from_file
+
+        def slow_from_file(*args, **kwargs):
+            loads.append(threading.current_thread().name)
+            time.sleep(0.2)
+            return from_file(*args, **kwargs)
+
+        barrier = threading.Barrier(8)
+        results = []
+
+        def read():
+            barrier.wait()
+            start = time.monotonic()
+            results.append((len(self.get_cached()), time.monotonic() - start))
+
+        with mock.patch.object(CalendarSnapshot, "from_file", slow_from_file):
+            threads = [threading.Thread(target=read) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # readers keep the current data and do not wait for the reload
+            self.assertEqual([n for n, _ in results], [1] * 8)
+            self.assertLess(max(t for _, t in results), 0.1)
+            self.get_snapshot.wait()
+
+        self.assertEqual(loads, ["cn_stock_holidays reload"])
+        self.assertEqual(len(self.get_cached()), 2)
+
+    def test_failed_reload_keeps_snapshot(self):
+        snapshot = self.get_snapshot()
+        self.write("20170127\n20170130\n")
+        with mock.patch.object(
+            CalendarSnapshot, "from_file", side_effect=OSError("broken")
+        ):
+            with self.assertLogs("cn_stock_holidays.meta_functions", "WARNING"):
+                self.get_snapshot()
+                self.get_snapshot.wait()
+        self.assertIs(self.get_snapshot.wait(), snapshot)
+
+    def test_failed_check_releases_lock(self):
+        errors = []
+
+        def get_cache_path():
+            if errors:
+                raise errors.pop()
+            return self.path
+
+        get_snapshot = meta_get_snapshot(
+            get_cache_path=get_cache_path, check_interval=0
+        )
+        get_snapshot()
+        # e.g. the cache directory can not be created
+        errors.append(PermissionError("denied"))
+        with self.assertRaises(PermissionError):
+            get_snapshot()
+
+        self.write("20170127\n20170130\n")
+        results = []
+        # a daemon thread, so a deadlock fails the test instead of hanging it
+        thread = threading.Thread(
+            target=lambda: results.append(get_snapshot.refresh()), daemon=True
+        )
+        thread.start()
+        thread.join(5)
+        self.assertEqual([len(s.days_off) for s in results], [2])
+
+    def test_readers_during_refresh(self):
+        errors = []
+        stop = threading.Event()
+
+        def read():
+            try:
+                while not stop.is_set():
+                    snapshot = self.get_snapshot()
+                    holiday = LATER_HOLIDAY in snapshot.days_off
+                    self.assertEqual(
+                        snapshot.index.is_trading_day(LATER_HOLIDAY), not holiday
+                    )
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(20):
+            self.write("20170127\n20170130\n" if i % 2 else "20170127\n")
+            self.get_snapshot.refresh()
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
@@ -0,0 +1,269 @@
+# coding: utf-8
+
+import datetime
+import unittest
+
+import cn_stock_holidays.data as shsz
+import cn_stock_holidays.data_hk as hkex
+from cn_stock_holidays.common import int_to_date
+from cn_stock_holidays.trading_index import TradingDayIndex
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # numpy and pandas are optional
+    np = None
+    pd = None
+
+
+class TestTradingDayIndex(unittest.TestCase):
+    def test_matches_holiday_sets(self):
+        markets = (
+            (shsz, shsz.get_cached(), set()),
+            (hkex,) + hkex.get_cached_with_half_day(),
+        )
+        for market, holidays, half_days in markets:
+            with self.subTest(market=market.__name__):
+                index = market.get_trading_day_index()
+                day = datetime.date.fromordinal(index.first - 10)
+                while day.toordinal() <= index.last + 10:
+                    trading = day.weekday() < 5 and day not in holidays
+                    self.assertEqual(market.is_trading_day(day), trading, day)
+                    self.assertEqual(
+                        day in list(market.trading_days_between(day, day)), trading
+                    )
+                    if market is hkex:
+                        self.assertEqual(
+                            market.is_half_day_trading_day(day),
+                            trading and day in half_days,
+                            day,
+                        )
+                    day += datetime.timedelta(days=1)
+
+    def test_compact_calendar(self):
+        index = shsz.get_trading_day_index()
+        self.assertEqual(len(index.days), index.last - index.first + 1)
+        self.assertEqual(memoryview(index.days).itemsize, 1)
+        self.assertGreater(index.nbytes, len(index.days))
+        self.assertLess(index.nbytes, 20 * len(index.days))
+
+    def test_empty(self):
+        index = TradingDayIndex(set())
+        self.assertEqual(len(index), 0)
+        self.assertTrue(index.is_trading_day(int_to_date(20170127)))
+        self.assertIsNone(index.next_trading_day(int_to_date(20170127)))
+        self.assertEqual(
+            index.count_trading_days(int_to_date(20170123), int_to_date(20170129)), 5
+        )
+        self.assertIsNone(index.horizon)
+
+    def test_horizon(self):
+        index = TradingDayIndex({int_to_date(20170127)}, {int_to_date(20170315)})
+        self.assertEqual(index.horizon, int_to_date(20170315).toordinal())
+        self.assertEqual(index.last, int_to_date(20171231).toordinal())
+
+
+class TestSessionIndex(unittest.TestCase):
+    def test_session_index_round_trip(self):
+        for market in (shsz, hkex):
+            with self.subTest(market=market.__name__):
+                days = list(
+                    market.trading_days_between(
+                        int_to_date(20160101), int_to_date(20181231)
+                    )
+                )
+                numbers = market.session_index(days)
+                self.assertEqual(numbers, list(range(numbers[0], numbers[-1] + 1)))
+                self.assertEqual(market.session_at(numbers), days)
+                self.assertEqual(
+                    market.session_index(datetime.datetime(2017, 1, 25, 15)),
+                    market.session_index(int_to_date(20170125)),
+                )
+                self.assertEqual(
+                    market.session_at(0),
+                    market.next_trading_day(
+                        datetime.date.fromordinal(
+                            market.get_trading_day_index().first - 1
+                        )
+                    ),
+                )
+
+    def test_session_index_invalid(self):
+        with self.assertRaises(ValueError):
+            shsz.session_index(int_to_date(20170128))  # Saturday
+        with self.assertRaises(ValueError):
+            shsz.session_index(int_to_date(20170127))  # Spring Festival
+        with self.assertRaises(IndexError):
+            shsz.session_at(-1)
+        with self.assertRaises(IndexError):
+            shsz.session_at(len(shsz.get_trading_day_index()))
+
+    def test_hk_half_day_has_session_number(self):
+        # Christmas Eve 2025 is a half-day trading day in Hong Kong
+        i = hkex.session_index(int_to_date(20251224))
+        self.assertEqual(hkex.session_at(i), int_to_date(20251224))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_session_index_numpy(self):
+        days = np.array(
+            ["2017-01-25", "2017-01-26", "2017-02-03", "2018-06-01"],
+            dtype="datetime64[D]",
+        )
+        numbers = shsz.session_index(days)
+        self.assertIsInstance(numbers, np.ndarray)
+        self.assertEqual(numbers.tolist(), shsz.session_index([d.item() for d in days]))
+        np.testing.assert_array_equal(shsz.session_at(numbers), days)
+
+        index = pd.DatetimeIndex(days).tz_localize("Asia/Shanghai")
+        np.testing.assert_array_equal(shsz.session_index(index), numbers)
+        np.testing.assert_array_equal(shsz.session_index(pd.Series(index)), numbers)
+
+        with self.assertRaises(ValueError):
+            shsz.session_index(np.array(["2017-01-28"], dtype="datetime64[D]"))
+        with self.assertRaises(IndexError):
+            shsz.session_at(np.array([0, -1]))
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestIsTradingDayArray(unittest.TestCase):
+    def test_matches_is_trading_day(self):
+        for market in (shsz, hkex):
+            with self.subTest(market=market.__name__):
+                index = market.get_trading_day_index()
+                first = datetime.date.fromordinal(index.first)
+                last = datetime.date.fromordinal(index.last)
+                days = pd.date_range(
+                    first - datetime.timedelta(days=30),
+                    last + datetime.timedelta(days=30),
+                )
+                expected = [market.is_trading_day(d.date()) for d in days]
+
+                mask = market.is_trading_day_array(days)
+                self.assertEqual(mask.dtype, np.bool_)
+                self.assertEqual(mask.tolist(), expected)
+                self.assertEqual(
+                    market.is_trading_day_array(days.values).tolist(), expected
+                )
+                self.assertEqual(
+                    market.is_trading_day_array(pd.Series(days)).tolist(), expected
+                )
+
+    def test_hk_half_day_is_trading_day(self):
+        mask = hkex.is_trading_day_array(
+            np.array(["2025-12-24", "2025-12-25"], dtype="datetime64[D]")
+        )
+        self.assertEqual(mask.tolist(), [True, False])
+
+    def test_intraday_timestamps_and_nat(self):
+        values = pd.DatetimeIndex(
+            ["2017-01-25 10:30", "2017-01-27 09:30", None], tz="Asia/Shanghai"
+        )
+        self.assertEqual(
+            shsz.is_trading_day_array(values).tolist(), [True, False, False]
+        )
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestRollTradingDayArray(unittest.TestCase):
+    def test_matches_next_previous_trading_day(self):
+        for market in (shsz, hkex):
+            with self.subTest(market=market.__name__):
+                index = market.get_trading_day_index()
+                first = datetime.date.fromordinal(index.first)
+                last = datetime.date.fromordinal(index.last)
+                days = pd.date_range(
+                    first - datetime.timedelta(days=30),
+                    last + datetime.timedelta(days=30),
+                )
+                dates = [d.date() for d in days]
+
+                def roll(d, step):
+                    if market.is_trading_day(d):
+                        return d
+                    if step > 0:
+                        return market.next_trading_day(d)
+                    return market.previous_trading_day(d)
+
+                forward = market.roll_trading_day_array(days, "forward")
+                self.assertEqual(forward.dtype, np.dtype("datetime64[D]"))
+                self.assertEqual(forward.tolist(), [roll(d, 1) for d in dates])
+
+                backward = market.roll_trading_day_array(days, "backward")
+                self.assertEqual(backward.tolist(), [roll(d, -1) for d in dates])
+
+                nearest = market.roll_trading_day_array(days, "nearest")
+                for d, f, b, n in zip(
+                    dates, forward.tolist(), backward.tolist(), nearest.tolist()
+                ):
+                    self.assertEqual(n, b if d - b < f - d else f)
+
+    def test_weekend_next_to_holiday_at_range_edge(self):
+        # 2018-01-01 is a Monday, 2021-12-31 a Friday, both at the edge of the range
+        for holiday in (datetime.date(2018, 1, 1), datetime.date(2021, 12, 31)):
+            with self.subTest(holiday=holiday):
+                index = TradingDayIndex({holiday})
+                dates = [holiday + datetime.timedelta(days=i) for i in range(-7, 8)]
+
+                def roll(d, step):
+                    while d.weekday() >= 5 or d == holiday:
+                        d += datetime.timedelta(days=step)
+                    return d
+
+                forward = index.roll_array(dates, "forward")
+                self.assertEqual(forward.tolist(), [roll(d, 1) for d in dates])
+                backward = index.roll_array(dates, "backward")
+                self.assertEqual(backward.tolist(), [roll(d, -1) for d in dates])
+
+        index = TradingDayIndex({datetime.date(2018, 1, 1)})
+        self.assertEqual(
+            index.roll_array(["2017-12-30"], "forward")[0], np.datetime64("2018-01-02")
+        )
+
+    def test_nat_and_invalid_direction(self):
+        values = np.array(["2017-01-27", "NaT"], dtype="datetime64[D]")
+        result = shsz.roll_trading_day_array(values)
+        self.assertEqual(result[0], np.datetime64("2017-02-03"))
+        self.assertTrue(np.isnat(result[1]))
+        with self.assertRaises(ValueError):
+            shsz.roll_trading_day_array(values, "sideways")
+
+
+class TestTradingDaysBetweenArray(unittest.TestCase):
+    def test_matches_trading_days_between(self):
+        for market in (shsz, hkex):
+            index = market.get_trading_day_index()
+            first = datetime.date.fromordinal(index.first)
+            last = datetime.date.fromordinal(index.last)
+            windows = [
+                (int_to_date(20170125), int_to_date(20170131)),
+                (int_to_date(20170131), int_to_date(20170125)),
+                (
+                    first - datetime.timedelta(days=30),
+                    first + datetime.timedelta(days=30),
+                ),
+                (
+                    last - datetime.timedelta(days=30),
+                    last + datetime.timedelta(days=30),
+                ),
+                (first, last),
+            ]
+            for start, end in windows:
+                with self.subTest(market=market.__name__, start=start, end=end):
+                    result = market.trading_days_between_array(start, end)
+                    if np is not None:
+                        self.assertFalse(result.flags.writeable)
+                        result = result.tolist()
+                    self.assertEqual(
+                        result, list(market.trading_days_between(start, end))
+                    )
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_is_view_inside_data_range(self):
+        a = shsz.trading_days_between_array(
+            int_to_date(20100101), int_to_date(20191231)
+        )
+        b = shsz.trading_days_between_array(
+            datetime.datetime(2015, 1, 1), datetime.datetime(2015, 12, 31)
+        )
+        self.assertTrue(np.shares_memory(a, b))
+        self.assertEqual(pd.DatetimeIndex(b)[0], pd.Timestamp("2015-01-05"))
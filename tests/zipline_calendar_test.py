@@ -0,0 +1,178 @@
+# coding: utf-8
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+try:
+    import numpy as np
+    import pandas as pd
+
+    from cn_stock_holidays.zipline import HKExchangeCalendar, SHSZExchangeCalendar
+    from cn_stock_holidays.zipline.cached_schedule import (
+        calendar_schedule_path,
+        zipline_init_supported,
+    )
+except ImportError:  # zipline is optional
+    SHSZExchangeCalendar = None
+
+START = "2023-01-01"
+END = "2024-06-30"
+
+
+@unittest.skipIf(SHSZExchangeCalendar is None, "zipline is not installed")
+class TestZiplineCalendars(unittest.TestCase):
+    def calendars(self):
+        return (SHSZExchangeCalendar, HKExchangeCalendar)
+
+    def build(self, calendar_class, end=END, **kwargs):
+        return calendar_class(
+            start=pd.Timestamp(START, tz="UTC"),
+            end=pd.Timestamp(end, tz="UTC"),
+            **kwargs,
+        )
+
+    def assert_same(self, name, value, expected):
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(value, expected, obj=name)
+        elif isinstance(expected, pd.Index):
+            self.assertTrue(value.equals(expected), name)
+        elif isinstance(expected, np.ndarray):
+            np.testing.assert_array_equal(value, expected, err_msg=name)
+        elif type(expected).__module__ == "lru":
+            self.assertIs(type(value), type(expected), name)
+        else:
+            self.assertEqual(value, expected, name)
+
+    def test_trading_calendar_init_by_default(self):
+        for calendar_class in self.calendars():
+            module = sys.modules[calendar_class.__module__]
+            with self.subTest(calendar=calendar_class.__name__):
+                with mock.patch.object(module, "init_calendar") as init_calendar:
+                    calendar = self.build(calendar_class)
+                init_calendar.assert_not_called()
+                self.assertIn("_trading_minutes_nanos", vars(calendar))
+
+                with mock.patch.object(
+                    module, "zipline_init_supported", return_value=False
+                ), mock.patch.object(module, "init_calendar") as init_calendar:
+                    with self.assertWarns(RuntimeWarning):
+                        self.build(calendar_class, lazy_minutes=True)
+                init_calendar.assert_not_called()
+
+    def test_schedule_cache_requires_lazy_minutes(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        for calendar_class in self.calendars():
+            with self.subTest(calendar=calendar_class.__name__):
+                with self.assertWarns(RuntimeWarning):
+                    self.build(calendar_class, schedule_cache_dir=tmpdir)
+                self.assertEqual(os.listdir(tmpdir), [])
+
+    def test_schedule_path_without_optional_attributes(self):
+        # e.g. a TradingCalendar without weekmask and the offsets
+        holidays = pd.DatetimeIndex(["2024-01-01"], tz="UTC")
+        calendar = types.SimpleNamespace(
+            name="TEST", tz="Asia/Shanghai", open_time="09:31", close_time="15:00"
+        )
+        path = calendar_schedule_path(
+            calendar, holidays, "11:30", "13:01", START, END, cache_dir="/tmp"
+        )
+        self.assertEqual(os.path.dirname(path), "/tmp")
+
+    def test_deprecated_end_default(self):
+        today = pd.Timestamp("today", tz="UTC").normalize()
+        for calendar_class in self.calendars():
+            module = sys.modules[calendar_class.__module__]
+            with self.subTest(calendar=calendar_class.__name__):
+                with self.assertWarns(DeprecationWarning):
+                    end_default = module.end_default
+                self.assertEqual(end_default, module.default_end())
+                with self.assertWarns(DeprecationWarning):
+                    self.assertEqual(module.end_base.normalize(), today)
+                with self.assertRaises(AttributeError):
+                    module.end_unknown
+
+                start = pd.Timestamp(START, tz="UTC")
+                with self.assertWarns(DeprecationWarning):
+                    calendar = calendar_class(start=start, end=module.end_default)
+                self.assertEqual(
+                    calendar.last_trading_session,
+                    calendar_class(start=start).last_trading_session,
+                )
+
+    @unittest.skipIf(
+        SHSZExchangeCalendar is not None and not zipline_init_supported(),
+        "TradingCalendar is not the zipline 1.x class",
+    )
+    def test_same_attributes_as_trading_calendar_init(self):
+        # fails when TradingCalendar.__init__ sets attributes init_calendar
+        # does not know about
+        for calendar_class in self.calendars():
+            with self.subTest(calendar=calendar_class.__name__):
+                expected = self.build(calendar_class)
+                calendar = self.build(calendar_class, lazy_minutes=True)
+                self.assertNotIn("_trading_minutes_nanos", vars(calendar))
+                calendar._trading_minutes_nanos
+
+                self.assertEqual(sorted(vars(calendar)), sorted(vars(expected)))
+                for name, value in vars(expected).items():
+                    self.assert_same(name, getattr(calendar, name), value)
+
+    def test_minutes_for_sessions_and_in_range(self):
+        for calendar_class in self.calendars():
+            with self.subTest(calendar=calendar_class.__name__):
+                calendar = self.build(calendar_class, lazy_minutes=True)
+                sessions = calendar.all_sessions
+                all_minutes = calendar.all_minutes
+
+                minutes = calendar.minutes_for_sessions(sessions[10], sessions[30])
+                first = all_minutes.searchsorted(calendar.schedule.market_open[10])
+                last = all_minutes.searchsorted(calendar.schedule.market_close[30])
+                self.assertTrue(minutes.equals(all_minutes[first : last + 1]))
+
+                start = pd.Timestamp("2023-03-01 03:00", tz="UTC")
+                end = pd.Timestamp("2023-03-10 06:00", tz="UTC")
+                expected = all_minutes[(all_minutes >= start) & (all_minutes <= end)]
+                self.assertTrue(calendar.minutes_in_range(start, end).equals(expected))
+
+    @unittest.skipIf(
+        SHSZExchangeCalendar is not None and not zipline_init_supported(),
+        "TradingCalendar is not the zipline 1.x class",
+    )
+    def test_schedule_cache(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        for calendar_class in self.calendars():
+            with self.subTest(calendar=calendar_class.__name__):
+                files = set(os.listdir(tmpdir))
+                expected = self.build(calendar_class)
+                saved = self.build(
+                    calendar_class, schedule_cache_dir=tmpdir, lazy_minutes=True
+                )
+                self.assertEqual(len(set(os.listdir(tmpdir)) - files), 1)
+                loaded = self.build(
+                    calendar_class, schedule_cache_dir=tmpdir, lazy_minutes=True
+                )
+                for calendar in (saved, loaded):
+                    pd.testing.assert_frame_equal(calendar.schedule, expected.schedule)
+                    self.assertTrue(calendar.all_minutes.equals(expected.all_minutes))
+
+                # another end in the same year is cut from the same file
+                files = set(os.listdir(tmpdir))
+                expected = self.build(calendar_class, end="2024-03-31")
+                calendar = self.build(
+                    calendar_class,
+                    end="2024-03-31",
+                    schedule_cache_dir=tmpdir,
+                    lazy_minutes=True,
+                )
+                self.assertEqual(set(os.listdir(tmpdir)), files)
+                pd.testing.assert_frame_equal(calendar.schedule, expected.schedule)
+                self.assertEqual(
+                    calendar.last_trading_session, expected.last_trading_session
+                )